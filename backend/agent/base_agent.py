@@ -14,21 +14,35 @@ class BaseAgent(ABC):
         self.llm = create_erag_api(
             api_type=config["api"],
             model=config["model"],
+            cache_namespace=agent_name if config.get("cache") else None,
         )
         logger.info(f"[{self.__class__.__name__}] api={config['api']}, model={config['model']}")
 
-    def _call_llm(self, prompt: str, temperature: float = None) -> str:
+    async def _call_llm(self, prompt: str, temperature: float = None, json_mode: bool = False) -> str:
         temp = temperature if temperature is not None else settings.temperature
         try:
-            response = self.llm.chat(
+            response = await self.llm.achat(
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temp,
+                json_mode=json_mode,
             )
             return response.strip() if isinstance(response, str) else response
         except Exception as e:
             logger.error(f"[{self.agent_name}] LLM ошибка: {e}")
             raise
 
+    async def _stream_llm(self, prompt: str, temperature: float = None):
+        temp = temperature if temperature is not None else settings.temperature
+        try:
+            async for chunk in self.llm.astream(
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temp,
+            ):
+                yield chunk
+        except Exception as e:
+            logger.error(f"[{self.agent_name}] LLM ошибка: {e}")
+            raise
+
     @abstractmethod
-    def execute(self, *args, **kwargs):
+    async def execute(self, *args, **kwargs):
         pass
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Реестр монет: все id CoinGecko с тикерами, названиями и соответствием символам CoinMarketCap.
+
+- Поиск по id, тикеру и названию — словари, O(1)
+- Один тикер может принадлежать многим монетам: кандидаты упорядочены по рангу CMC,
+  монеты из базового списка VALID_COINS идут первыми
+- Индексы пересобираются целиком и подменяются одним присваиванием, читатели не блокируются
+- Снимок хранится на диске (gzip JSON, строка на монету) и читается при старте;
+  без снимка реестр работает на базовом списке
+"""
+import os
+import gzip
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from agent.contracts.constants import VALID_COINS, COIN_SYMBOLS
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT_VERSION = 1
+
+# Названия и тикеры монет, совпадающие с обычными словами: в свободном тексте запроса
+# монетой не считаются, тикер из списка находится только с префиксом $ ("$FLOW", "$not")
+COMMON_WORDS = frozenset({
+    "act", "all", "amp", "and", "any", "ape", "arc", "balancer", "band", "beam", "blur", "bone",
+    "book", "cat", "compound", "convex", "core", "dash", "dog", "drift", "echo", "ever", "fluid",
+    "flow", "for", "four", "gas", "gala", "harmony", "helium", "hot", "immutable", "just", "magic",
+    "maker", "mantle", "mask", "metal", "move", "near", "new", "not", "now", "ocean", "one",
+    "optimism", "origin", "pixel", "polygon", "power", "quant", "render", "request", "ronin",
+    "safe", "sky", "sonic", "stacks", "status", "stellar", "story", "sun", "sushi", "tether",
+    "the", "ton", "top", "trump", "turbo", "usual", "walrus", "win", "world", "you",
+})
+
+
+class CoinInfo(NamedTuple):
+    id: str
+    symbol: str
+    name: str
+    rank: Optional[int] = None
+    cmc_symbol: Optional[str] = None
+
+
+class _Index(NamedTuple):
+    by_id: Dict[str, CoinInfo]
+    by_symbol: Dict[str, Tuple[str, ...]]
+    by_name: Dict[str, str]
+    cmc_to_cg: Dict[str, str]
+
+
+def _baseline() -> List[CoinInfo]:
+    return [CoinInfo(cid, COIN_SYMBOLS.get(cid, cid).lower(), cid.replace("-", " ").title(),
+                     rank, COIN_SYMBOLS.get(cid))
+            for rank, cid in enumerate(VALID_COINS, 1)]
+
+
+def _build_index(coins: Iterable[CoinInfo]) -> _Index:
+    by_id = {c.id: c for c in coins}
+    for c in _baseline():
+        # Базовые монеты всегда валидны и сохраняют свои символы CMC
+        known = by_id.get(c.id)
+        by_id[c.id] = c if known is None else known._replace(
+            cmc_symbol=c.cmc_symbol or known.cmc_symbol,
+            rank=known.rank if known.rank is not None else c.rank)
+
+    baseline = set(VALID_COINS)
+    ordered = sorted(by_id.values(),
+                     key=lambda c: (c.id not in baseline, c.rank is None, c.rank or 0, c.id))
+    by_symbol: Dict[str, list] = {}
+    by_name, cmc_to_cg = {}, {}
+    for c in ordered:
+        by_symbol.setdefault(c.symbol.lower(), []).append(c.id)
+        by_name.setdefault(c.name.lower(), c.id)
+        if c.cmc_symbol:
+            cmc_to_cg.setdefault(c.cmc_symbol.upper(), c.id)
+    return _Index(by_id, {s: tuple(ids) for s, ids in by_symbol.items()}, by_name, cmc_to_cg)
+
+
+class CoinRegistry:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.updated_at: Optional[float] = None
+        # Номер версии индексов: по нему производные структуры (матчер запроса) понимают,
+        # что их пора пересобрать
+        self.version = 0
+        self._lock = threading.Lock()
+        self._index = _build_index([])
+        if path:
+            self.load_snapshot()
+
+    def __contains__(self, coin_id: str) -> bool:
+        return coin_id in self._index.by_id
+
+    def __len__(self) -> int:
+        return len(self._index.by_id)
+
+    def get(self, coin_id: str) -> Optional[CoinInfo]:
+        return self._index.by_id.get(coin_id)
+
+    def resolve(self, term: str) -> Optional[str]:
+        """id, название или тикер → id CoinGecko. При коллизии тикера — самая крупная монета."""
+        t = term.strip().lower()
+        index = self._index
+        if t in index.by_id:
+            return t
+        if t in index.by_name:
+            return index.by_name[t]
+        ids = index.by_symbol.get(t)
+        return ids[0] if ids else None
+
+    def ids_for_symbol(self, symbol: str) -> Tuple[str, ...]:
+        return self._index.by_symbol.get(symbol.lower(), ())
+
+    def cmc_symbol(self, coin_id: str) -> str:
+        c = self._index.by_id.get(coin_id)
+        if c is None:
+            return coin_id.upper()
+        return c.cmc_symbol or c.symbol.upper()
+
+    def from_cmc_symbol(self, symbol: str) -> Optional[str]:
+        return self._index.cmc_to_cg.get(symbol.upper())
+
+    def aliases(self, max_rank: int) -> Dict[str, str]:
+        """Названия крупных монет для поиска в тексте запроса без учёта регистра."""
+        terms = {}
+        for c in self._index.by_id.values():
+            if c.rank is None or c.rank > max_rank or c.name.lower() in COMMON_WORDS:
+                continue
+            terms.setdefault(c.name.lower(), c.id)
+        return terms
+
+    def tickers(self, max_rank: int) -> Dict[str, str]:
+        """Тикеры крупных монет: в тексте ищутся заглавными ("FLOKI") или с префиксом $."""
+        index = self._index
+        terms = {}
+        for c in index.by_id.values():
+            if c.rank is None or c.rank > max_rank:
+                continue
+            # Короткие тикеры ("A", "OP") слишком часто совпадают с обычными словами
+            if len(c.symbol) >= 3 and index.by_symbol[c.symbol.lower()][0] == c.id:
+                terms.setdefault(c.symbol.upper(), c.id)
+        return terms
+
+    def refresh(self, cg_coins: List[dict], cmc_coins: Optional[List[dict]] = None):
+        """cg_coins — ответ /coins/list, cmc_coins — ответ /v1/cryptocurrency/map."""
+        coins = {c["id"]: CoinInfo(c["id"], (c.get("symbol") or "").lower(), c.get("name") or c["id"])
+                 for c in cg_coins if c.get("id")}
+        by_key = {}
+        for c in coins.values():
+            by_key.setdefault((c.symbol, c.name.lower()), c.id)
+
+        matched = 0
+        for m in sorted(cmc_coins or [], key=lambda m: m.get("rank") or float("inf")):
+            symbol = (m.get("symbol") or "").upper()
+            cid = m.get("slug") if m.get("slug") in coins else None
+            cid = cid or by_key.get((symbol.lower(), (m.get("name") or "").lower()))
+            if cid is None or coins[cid].cmc_symbol:
+                continue
+            coins[cid] = coins[cid]._replace(rank=m.get("rank"), cmc_symbol=symbol)
+            matched += 1
+
+        self._install(list(coins.values()), time.time())
+        logger.info(f"Реестр монет: {len(self)} монет, сопоставлено с CMC: {matched}")
+        self.save_snapshot()
+
+    def _install(self, coins: List[CoinInfo], updated_at: Optional[float]):
+        index = _build_index(coins)
+        with self._lock:
+            self._index = index
+            self.updated_at = updated_at
+            self.version += 1
+
+    def load_snapshot(self) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("v") != _SNAPSHOT_VERSION:
+                return False
+            self._install([CoinInfo(*row) for row in data["coins"]], data.get("updated_at"))
+            logger.info(f"Реестр монет загружен из снимка: {len(self)} монет")
+            return True
+        except Exception as e:
+            logger.warning(f"Снимок реестра монет не прочитан: {e}")
+            return False
+
+    def save_snapshot(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump({"v": _SNAPSHOT_VERSION, "updated_at": self.updated_at,
+                           "coins": [list(c) for c in self._index.by_id.values()]},
+                          f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"Снимок реестра монет не сохранён: {e}")
+
+    def is_stale(self) -> bool:
+        return (self.updated_at is None
+                or time.time() - self.updated_at >= settings.coin_registry_refresh_interval)
+
+    def stats(self) -> dict:
+        index = self._index
+        return {"coins": len(index.by_id), "symbols": len(index.by_symbol),
+                "ambiguous_symbols": sum(1 for ids in index.by_symbol.values() if len(ids) > 1),
+                "cmc_mapped": len(index.cmc_to_cg), "updated_at": self.updated_at}
+
+
+class CoinRegistryUpdater:
+    """Фоновое обновление реестра из CoinGecko и CoinMarketCap через общий ProviderManager."""
+
+    def __init__(self, registry: CoinRegistry, manager):
+        self.registry = registry
+        self.manager = manager
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            if self.registry.is_stale():
+                await self.update()
+            await asyncio.sleep(settings.coin_registry_check_interval)
+
+    async def update(self) -> bool:
+        from agent.providers import FetchStrategy
+
+        cg, cmc = await asyncio.gather(
+            self.manager.adispatch("list_coins", FetchStrategy.SPECIFIC, "coingecko"),
+            self.manager.adispatch("list_coins", FetchStrategy.SPECIFIC, "coinmarketcap"))
+        if not cg.success:
+            logger.warning(f"Реестр монет не обновлён: {cg.error}")
+            return False
+        await asyncio.to_thread(self.registry.refresh, cg.data, cmc.data if cmc.success else None)
+        return True
+
+
+coin_registry = CoinRegistry(settings.coin_registry_path)
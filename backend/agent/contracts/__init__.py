@@ -1,6 +1,7 @@
 from agent.contracts.enums import AllowedFunction, AgentStatus
-from agent.contracts.constants import VALID_COINS, COIN_ALIASES, PERIOD_KEYWORDS
+from agent.contracts.constants import VALID_COINS, COIN_SYMBOLS, COIN_ALIASES, PERIOD_KEYWORDS
 from agent.contracts.plan import PlanResult
+from agent.contracts.series import PriceSeries
 from agent.contracts.data import DataEntry, FetchedData
 from agent.contracts.context import FormattedContext
 from agent.contracts.trace import StepTrace, PipelineTrace
\ No newline at end of file
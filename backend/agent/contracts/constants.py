@@ -7,6 +7,20 @@ VALID_COINS = [
     "tezos", "eos", "bitcoin-cash",
 ]
 
+# Символы CoinMarketCap для базовых монет; остальные берутся из реестра монет
+COIN_SYMBOLS = {
+    "bitcoin": "BTC", "ethereum": "ETH", "tether": "USDT",
+    "bnb": "BNB", "solana": "SOL", "ripple": "XRP",
+    "dogecoin": "DOGE", "cardano": "ADA", "tron": "TRX",
+    "avalanche": "AVAX", "shiba-inu": "SHIB", "polkadot": "DOT",
+    "litecoin": "LTC", "chainlink": "LINK", "uniswap": "UNI",
+    "stellar": "XLM", "monero": "XMR", "near": "NEAR",
+    "cosmos": "ATOM", "filecoin": "FIL", "aptos": "APT",
+    "arbitrum": "ARB", "optimism": "OP", "aave": "AAVE",
+    "algorand": "ALGO", "fantom": "FTM", "eos": "EOS",
+    "bitcoin-cash": "BCH",
+}
+
 COIN_ALIASES = {
     "btc": "bitcoin", "eth": "ethereum", "sol": "solana",
     "xrp": "ripple", "doge": "dogecoin", "ada": "cardano",
@@ -24,4 +38,6 @@ PERIOD_KEYWORDS = {
     "неделю": 7, "недели": 14,
     "месяц": 30, "квартал": 90,
     "полгода": 180, "год": 365,
+    "hour": 1, "day": 1, "today": 1, "week": 7,
+    "month": 30, "quarter": 90, "year": 365,
 }
\ No newline at end of file
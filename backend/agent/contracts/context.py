@@ -4,4 +4,5 @@ from pydantic import BaseModel, Field
 class FormattedContext(BaseModel):
     context_str: str
     total_chars: int = 0
+    total_tokens: int = 0
     was_truncated: bool = False
\ No newline at end of file
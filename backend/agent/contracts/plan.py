@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import List
+from typing import List, Optional
 from agent.contracts.enums import AllowedFunction
-from agent.contracts.constants import VALID_COINS
+from agent.coin_registry import coin_registry
 
 
 class PlanResult(BaseModel):
@@ -9,6 +9,8 @@ class PlanResult(BaseModel):
     coins: List[str] = Field(default=["bitcoin"], min_length=1)
     period_days: int = Field(default=7, gt=0, le=365)
     original_query: str = Field(default="")
+    planner_path: str = Field(default="llm")
+    confidence: Optional[float] = None
 
     @field_validator("functions")
     @classmethod
@@ -22,7 +24,9 @@ class PlanResult(BaseModel):
     @field_validator("coins")
     @classmethod
     def validate_coins(cls, v):
-        invalid = [c for c in v if c not in VALID_COINS]
+        # Тикер или название приводятся к id CoinGecko ("BTC" → "bitcoin")
+        resolved = [coin_registry.resolve(c) for c in v]
+        invalid = [c for c, r in zip(v, resolved) if r is None]
         if invalid:
             raise ValueError(f"Неизвестные монеты: {invalid}")
-        return v
\ No newline at end of file
+        return list(dict.fromkeys(resolved))
\ No newline at end of file
@@ -0,0 +1,101 @@
+import json
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from agent.downsample import lttb_indices
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _json_items(column: np.ndarray) -> List[bytes]:
+    """Элементы колонки как JSON-литералы: вся колонка сериализуется одним вызовом и режется по запятым."""
+    if ORJSON_AVAILABLE:
+        # orjson пишет NaN и inf как null
+        encoded = orjson.dumps(column, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        values = np.where(np.isfinite(column), column, None) if column.dtype.kind == "f" else column
+        encoded = json.dumps(values.tolist(), separators=(",", ":")).encode()
+    return encoded[1:-1].split(b",")
+
+
+class PriceSeries:
+    """
+    Ценовой ряд в двух колонках NumPy: timestamps (int64, мс) и prices (float64).
+    Колонки только для чтения, поэтому срезы — это представления без копирования,
+    а один ряд безопасно делят кэш, форматтер и API.
+    """
+    __slots__ = ("timestamps", "prices")
+
+    def __init__(self, timestamps, prices):
+        ts = np.asarray(timestamps, dtype=np.int64)
+        pr = np.asarray(prices, dtype=np.float64)
+        if ts.shape != pr.shape or ts.ndim != 1:
+            raise ValueError(f"Колонки ряда разной длины: {ts.shape} и {pr.shape}")
+        ts.flags.writeable = False
+        pr.flags.writeable = False
+        self.timestamps = ts
+        self.prices = pr
+
+    @classmethod
+    def from_pairs(cls, pairs) -> "PriceSeries":
+        """[[timestamp, price], ...] как в ответе CoinGecko; точки с null/NaN вместо цены отбрасываются."""
+        arr = np.asarray(pairs, dtype=np.float64).reshape(-1, 2)
+        arr = arr[np.isfinite(arr).all(axis=1)]
+        return cls(arr[:, 0].astype(np.int64), arr[:, 1])
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __iter__(self) -> Iterator[Tuple[int, float]]:
+        return zip(self.timestamps.tolist(), self.prices.tolist())
+
+    def __getitem__(self, item) -> "PriceSeries":
+        if not isinstance(item, slice):
+            raise TypeError("PriceSeries поддерживает только срезы")
+        return PriceSeries(self.timestamps[item], self.prices[item])
+
+    @property
+    def last_ts(self):
+        return int(self.timestamps[-1]) if len(self) else None
+
+    def since(self, ts: int) -> "PriceSeries":
+        """Представление с первого отсчёта не раньше ts (бинарный поиск)."""
+        return self[int(np.searchsorted(self.timestamps, ts, side="left")):]
+
+    def concat(self, other: "PriceSeries") -> "PriceSeries":
+        return PriceSeries(np.concatenate((self.timestamps, other.timestamps)),
+                           np.concatenate((self.prices, other.prices)))
+
+    def downsample(self, n: int) -> "PriceSeries":
+        if n >= len(self):
+            return self
+        idx = lttb_indices(self.timestamps, self.prices, n)
+        return PriceSeries(self.timestamps[idx], self.prices[idx])
+
+    def change_percent(self):
+        if len(self) < 2 or self.prices[0] == 0:
+            return None
+        return round(float((self.prices[-1] - self.prices[0]) / self.prices[0] * 100), 2)
+
+    def to_points(self):
+        return [{"timestamp": ts, "price": p} for ts, p in self]
+
+    def to_json(self) -> bytes:
+        """
+        JSON-массив точек {"timestamp", "price"} (UTF-8) прямо из колонок: без dict на точку
+        и без валидации pydantic. Литералы двух колонок чередуются с разделителями срезами списка.
+        """
+        n = len(self)
+        if not n:
+            return b"[]"
+        parts = [b',"price":'] * (4 * n - 1)
+        parts[0::4] = _json_items(self.timestamps)
+        parts[2::4] = _json_items(self.prices)
+        parts[3::4] = [b'},{"timestamp":'] * (n - 1)
+        return b'[{"timestamp":' + b"".join(parts) + b"}]"
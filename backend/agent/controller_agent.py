@@ -1,15 +1,19 @@
 import time
+import asyncio
+import inspect
 import logging
 import traceback
-from typing import TypedDict, Optional, List, Dict, Any
+from typing import TypedDict, Optional, List, Dict, Any, AsyncGenerator, Tuple
 
 from langgraph.graph import StateGraph, END
 
 from agent.planner_agent import PlannerAgent
 from agent.fetcher_agent import FetcherAgent
 from agent.data_formatter import DataFormatter
+from agent.series_analytics import SeriesAnalyzer
 from agent.rag_agent import RAGReasonerAgent
 from agent.contracts import PlanResult, FetchedData, FormattedContext
+from agent.providers import ProviderManager
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +22,7 @@ class PipelineState(TypedDict):
     user_query: str
     plan: Optional[PlanResult]
     fetched_data: Optional[FetchedData]
+    analytics: Optional[Dict[str, Any]]
     context: Optional[FormattedContext]
     answer: Optional[str]
     trace: List[Dict[str, Any]]
@@ -27,38 +32,41 @@ class PipelineState(TypedDict):
 
 
 class ControllerAgent:
-    def __init__(self):
+    # Этапы по порядку. reasoner — последний: в потоковом режиме он отдаёт токены сам,
+    # поэтому граф для /ask/stream строится из тех же этапов без него
+    STEPS = ("planner", "fetcher", "analytics", "formatter", "reasoner")
+
+    def __init__(self, provider: Optional[ProviderManager] = None):
         logger.info("Инициализация ControllerAgent (LangGraph)...")
         self.planner = PlannerAgent()
-        self.fetcher = FetcherAgent()
+        self.fetcher = FetcherAgent(provider)
+        self.analyzer = SeriesAnalyzer()
         self.formatter = DataFormatter()
         self.reasoner = RAGReasonerAgent()
-        self.graph = self._build_graph()
+        self.graph = self._build_graph(self.STEPS)
+        self.stream_graph = self._build_graph(self.STEPS[:-1])
         logger.info("ControllerAgent готов ✓")
 
-    def _build_graph(self):
+    def _build_graph(self, steps):
         g = StateGraph(PipelineState)
-        g.add_node("planner", self._node_planner)
-        g.add_node("fetcher", self._node_fetcher)
-        g.add_node("formatter", self._node_formatter)
-        g.add_node("reasoner", self._node_reasoner)
+        for name in steps:
+            g.add_node(name, getattr(self, f"_node_{name}"))
         g.add_node("handle_error", self._node_error)
-        g.set_entry_point("planner")
+        g.set_entry_point(steps[0])
 
-        for src, dst in [("planner", "fetcher"), ("fetcher", "formatter"),
-                         ("formatter", "reasoner")]:
+        for src, dst in zip(steps, steps[1:] + (END,)):
             g.add_conditional_edges(src, self._check_errors,
                                     {"continue": dst, "error": "handle_error"})
-        g.add_conditional_edges("reasoner", self._check_errors,
-                                {"continue": END, "error": "handle_error"})
         g.add_edge("handle_error", END)
         return g.compile()
 
-    def _make_node(self, step_name, func, state):
+    async def _make_node(self, step_name, func, state):
         logger.info(f"→ {step_name}")
         start = time.time()
         try:
             result = func()
+            if inspect.isawaitable(result):
+                result = await result
             elapsed = (time.time() - start) * 1000
             logger.info(f"  ✓ {step_name} ({elapsed:.0f}мс)")
             return {
@@ -79,26 +87,37 @@ class ControllerAgent:
                 }],
             }, None
 
-    def _node_planner(self, state):
-        update, plan = self._make_node("planner",
+    async def _node_planner(self, state):
+        update, plan = await self._make_node("planner",
             lambda: self.planner.execute(state["user_query"]), state)
-        if plan: update["plan"] = plan
+        if plan:
+            update["plan"] = plan
+            update["trace"][-1]["details"] = {"path": plan.planner_path,
+                                              "confidence": plan.confidence}
         return update
 
-    def _node_fetcher(self, state):
-        update, data = self._make_node("fetcher",
+    async def _node_fetcher(self, state):
+        update, data = await self._make_node("fetcher",
             lambda: self.fetcher.execute(state["plan"]), state)
         if data: update["fetched_data"] = data
         return update
 
-    def _node_formatter(self, state):
-        update, ctx = self._make_node("formatter",
-            lambda: self.formatter.format(state["fetched_data"], state["user_query"]), state)
+    async def _node_analytics(self, state):
+        # NumPy-вычисления отпускают GIL лишь частично — уводим их из event loop
+        update, analytics = await self._make_node("analytics",
+            lambda: asyncio.to_thread(self.analyzer.analyze, state["fetched_data"]), state)
+        if analytics: update["analytics"] = analytics
+        return update
+
+    async def _node_formatter(self, state):
+        update, ctx = await self._make_node("formatter",
+            lambda: self.formatter.format(state["fetched_data"], state["user_query"],
+                                          state.get("analytics")), state)
         if ctx: update["context"] = ctx
         return update
 
-    def _node_reasoner(self, state):
-        update, answer = self._make_node("reasoner",
+    async def _node_reasoner(self, state):
+        update, answer = await self._make_node("reasoner",
             lambda: self.reasoner.execute(state["user_query"], state["context"]), state)
         if answer: update["answer"] = answer
         return update
@@ -112,19 +131,19 @@ class ControllerAgent:
     def _check_errors(state):
         return "error" if state.get("errors") else "continue"
 
-    def process_query(self, user_query: str) -> str:
-        result = self.get_trace(user_query)
-        return result.get("answer", "Ответ не сформирован")
-
-    def get_trace(self, user_query: str) -> dict:
+    @staticmethod
+    def _initial_state(user_query: str) -> PipelineState:
         logger.info(f"{'='*50}\nЗапрос: {user_query}\n{'='*50}")
-        initial: PipelineState = {
+        return {
             "user_query": user_query, "plan": None, "fetched_data": None,
-            "context": None, "answer": None, "trace": [], "errors": [],
+            "analytics": None, "context": None, "answer": None, "trace": [], "errors": [],
             "pipeline_start_time": time.time(), "current_step": "start",
         }
+
+    async def aget_trace(self, user_query: str) -> dict:
+        initial = self._initial_state(user_query)
         try:
-            final = self.graph.invoke(initial)
+            final = await self.graph.ainvoke(initial)
             total = (time.time() - final["pipeline_start_time"]) * 1000
             self._log_trace(final["trace"], total)
             return {"answer": final.get("answer", ""), "trace": final.get("trace", []),
@@ -134,6 +153,46 @@ class ControllerAgent:
             return {"answer": f"Критическая ошибка: {e}", "trace": [], "errors": [str(e)],
                     "total_time_ms": 0}
 
+    async def astream_trace(self, user_query: str) -> AsyncGenerator[Tuple[str, dict], None]:
+        """
+        Тот же пайплайн, но по событиям: ("step", запись трейса) после каждого этапа
+        до reasoner, затем ("token", фрагмент) по мере генерации и в конце ("done", итог).
+        """
+        state = self._initial_state(user_query)
+        try:
+            async for update in self.stream_graph.astream(state, stream_mode="updates"):
+                for node, delta in update.items():
+                    state.update(delta or {})
+                    if node == "handle_error":
+                        continue
+                    step = dict(state["trace"][-1])
+                    if node == "planner" and state["plan"] is not None:
+                        step["plan"] = state["plan"].model_dump()
+                    yield "step", step
+
+            if not state["errors"]:
+                logger.info("→ reasoner (поток)")
+                start, first_token_ms, parts = time.time(), None, []
+                async for chunk in self.reasoner.astream(user_query, state["context"]):
+                    if first_token_ms is None:
+                        first_token_ms = (time.time() - start) * 1000
+                    parts.append(chunk)
+                    yield "token", {"text": chunk}
+                step = {"step": "reasoner", "status": "success",
+                        "time_ms": (time.time() - start) * 1000, "first_token_ms": first_token_ms}
+                state["trace"] = state["trace"] + [step]
+                state["answer"] = "".join(parts)
+                yield "step", step
+        except Exception as e:
+            logger.error(f"Pipeline упал: {traceback.format_exc()}")
+            state["errors"] = state["errors"] + [str(e)]
+            state["answer"] = f"Критическая ошибка: {e}"
+
+        total = (time.time() - state["pipeline_start_time"]) * 1000
+        self._log_trace(state["trace"], total)
+        yield "done", {"answer": state.get("answer") or "", "trace": state["trace"],
+                       "errors": state["errors"], "total_time_ms": total}
+
     @staticmethod
     def _log_trace(trace, total):
         parts = [f"{'✓' if s['status']=='success' else '✗'} {s['step']}({s['time_ms']:.0f}мс)"
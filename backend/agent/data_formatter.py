@@ -1,54 +1,266 @@
+import re
 import json
+import math
 import logging
+from datetime import datetime, timezone
+from typing import Optional
 
-from agent.contracts import FetchedData, FormattedContext
+import numpy as np
+
+from agent.contracts import FetchedData, FormattedContext, PriceSeries
+from agent.providers.series_store import DAY_MS
 from settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Приближение BPE-токенизатора: латиница ~4 символа на токен, кириллица ~3, числа — группами по 3 цифры
+_TOKEN_PIECES = re.compile(r"\d+|[a-zA-Z]+|[а-яёА-ЯЁ]+|[^\w\s]|\s+")
+
+_TRUNCATED = "(усечено)"
+
+LEGEND = ("Формат: таблицы — строка заголовков и строки значений через '|'; "
+          "ряд цен — start, step и значения через запятую; у прореженного ряда шаг неравномерный, "
+          "t_h/t_d — смещение каждой точки от start в часах/днях; K/M/B/T — тысячи/млн/млрд/трлн.")
+
+
+def estimate_tokens(text: str) -> int:
+    total = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        c = piece[0]
+        if c.isdigit():
+            total += math.ceil(len(piece) / 3)
+        elif c.isspace():
+            total += 0 if piece == " " else 1
+        elif c.isascii() and c.isalpha():
+            total += math.ceil(len(piece) / 4)
+        elif c.isalpha():
+            total += math.ceil(len(piece) / 3)
+        else:
+            total += 1
+    return total
+
+
+def _num(v) -> str:
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        return "" if v is None else str(v)
+    a = abs(v)
+    for limit, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if a >= limit:
+            return f"{v / limit:.2f}{suffix}"
+    if a >= 1000:
+        return f"{v:.2f}".rstrip("0").rstrip(".")
+    return f"{v:.6g}"
+
+
+def _ts(ms) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def _step(ms) -> str:
+    hours = round(ms / 3_600_000)
+    if hours == 0:
+        return f"{round(ms / 60_000)}m"
+    return f"{hours // 24}d" if hours >= 24 and hours % 24 == 0 else f"{hours}h"
+
+
+class _Fixed(str):
+    """Строка, которая остаётся при любом бюджете: заголовки секций и таблиц, описание ряда."""
+
+
+class _SeriesSlot:
+    """Место под значения ряда: заполняется после таблиц, когда известен остаток бюджета."""
+    __slots__ = ("prices", "max_points", "text")
+
+    def __init__(self, prices, max_points=None):
+        self.prices = prices
+        self.max_points = max_points
+        self.text = ""
+
+
+def _table(rows, key_name=None):
+    """Список словарей (или словарь словарей с ключом key_name) → заголовок + строки."""
+    if isinstance(rows, dict):
+        rows = [{key_name: k, **v} for k, v in rows.items()]
+    columns = []
+    for row in rows:
+        for col, v in row.items():
+            if col not in columns and v is not None and not isinstance(v, (dict, list, tuple)):
+                columns.append(col)
+    header = _Fixed("|".join(columns))
+    return header, ["|".join(_num(row.get(c)) for c in columns) for row in rows]
+
+
+def _is_series_map(data) -> bool:
+    return isinstance(data, dict) and bool(data) and all(
+        isinstance(cd, dict) and isinstance(cd.get("prices"), (PriceSeries, list, tuple))
+        for cd in data.values())
+
+
+def _is_row_map(data) -> bool:
+    return isinstance(data, dict) and bool(data) and all(isinstance(cd, dict) for cd in data.values())
+
 
 class DataFormatter:
-    def format(self, fetched_data: FetchedData, user_query: str = "") -> FormattedContext:
-        entries = []
+    """
+    Компактное представление данных для промпта reasoner'а: текущие цены и топ — таблицами,
+    исторические ряды — колонками (начало, шаг, значения). Размер считается в токенах модели
+    reasoner'а и укладывается в её бюджет за один проход: сначала резервируются заголовки,
+    описания рядов и по две точки на ряд, затем идут строки таблиц, остаток делится
+    поровну между рядами, длинные ряды прореживаются LTTB с сохранением пиков и провалов;
+    шаг у них неравномерный, поэтому вместо step пишется смещение каждой точки от start.
+    Если для ряда есть готовая аналитика, она идёт отдельной таблицей, а от самого ряда
+    остаётся лишь несколько точек для общей формы.
+    """
+
+    def format(self, fetched_data: FetchedData, user_query: str = "",
+               analytics: Optional[dict] = None) -> FormattedContext:
+        budget = self._budget()
+        blocks, slots = [], []
+        was_truncated = False
+        analyzed = set((analytics or {}).get("series", {}))
+        if analyzed:
+            blocks.append(self._analytics_block(analytics))
+
         for entry in fetched_data.entries:
-            if entry.data is not None:
-                entries.append({"function": entry.function, "data": entry.data})
+            if entry.data is None:
+                continue
+            data = entry.data
+            lines = [_Fixed(f"## {entry.function}")]
+            if _is_series_map(data):
+                for cid, cd in data.items():
+                    slots.append(_SeriesSlot(cd["prices"], settings.context_points_with_analytics
+                                             if cid in analyzed else None))
+                    lines += [_Fixed(self._series_meta(cid, cd)), slots[-1]]
+            elif isinstance(data, (list, tuple)) and data and all(isinstance(r, dict) for r in data):
+                header, rows = _table(data)
+                lines += [header, *rows]
+            elif _is_row_map(data):
+                header, rows = _table(data, key_name="coin")
+                lines += [header, *rows]
+            else:
+                lines.append(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+            blocks.append(lines)
 
         if fetched_data.errors:
-            entries.append({"data_quality": {
-                "completeness": fetched_data.completeness,
-                "errors": fetched_data.errors,
-            }})
+            blocks.append([_Fixed("## data_quality"),
+                           f"completeness={fetched_data.completeness:.2f}",
+                           *[f"error: {e}" for e in fetched_data.errors]])
 
-        context_str = json.dumps(entries, ensure_ascii=False, indent=2)
-        was_truncated = False
+        # Что выводится при любом бюджете, оплачивается до раздачи строк и долей рядов:
+        # заголовки, описания рядов и сами ряды в минимальном виде — две точки
+        floors = [estimate_tokens(self._series_values(slot.prices, 0, slot.max_points)[0]) + 1
+                  for slot in slots]
+        used = estimate_tokens(LEGEND) + sum(floors) + sum(
+            estimate_tokens(line) + 1 for lines in blocks for line in lines if isinstance(line, _Fixed))
+        # Пометка об усечении резервируется за каждым блоком со строками и возвращается, если блок влез
+        marker = estimate_tokens(_TRUNCATED) + 1
+        optional = [any(not isinstance(l, (_Fixed, _SeriesSlot)) for l in lines) for lines in blocks]
+        used += marker * sum(optional)
+        for lines, has_rows in zip(blocks, optional):
+            kept, cut = [], False
+            for line in lines:
+                if isinstance(line, (_Fixed, _SeriesSlot)):
+                    kept.append(line)
+                    continue
+                cost = estimate_tokens(line) + 1
+                if used + cost > budget:
+                    cut = True
+                    continue
+                kept.append(line)
+                used += cost
+            if cut:
+                kept.append(_TRUNCATED)
+                was_truncated = True
+            elif has_rows:
+                used -= marker
+            lines[:] = kept
 
-        if len(context_str) > settings.max_context_length:
-            logger.warning(f"[Formatter] Контекст {len(context_str)} > {settings.max_context_length}, усечение")
-            entries = self._truncate(entries)
-            context_str = json.dumps(entries, ensure_ascii=False, indent=2)
-            was_truncated = True
+        share = max(0, budget - used) // max(1, len(slots))
+        for slot, floor in zip(slots, floors):
+            slot.text, thinned = self._series_values(slot.prices, floor - 1 + share, slot.max_points)
+            was_truncated |= thinned
 
-        result = FormattedContext(context_str=context_str,
-                                 total_chars=len(context_str), was_truncated=was_truncated)
-        logger.info(f"[Formatter] {len(entries)} записей, {result.total_chars} символов, усечён={was_truncated}")
+        context_str = "\n".join([LEGEND] + [
+            "\n".join(l.text if isinstance(l, _SeriesSlot) else l for l in lines) for lines in blocks])
+        total_tokens = estimate_tokens(context_str)
+        result = FormattedContext(context_str=context_str, total_chars=len(context_str),
+                                  total_tokens=total_tokens, was_truncated=was_truncated)
+        logger.info(f"[Formatter] {len(blocks)} блоков, ~{total_tokens}/{budget} токенов, "
+                    f"{result.total_chars} символов, усечён={was_truncated}")
         return result
 
     @staticmethod
-    def _truncate(entries):
-        truncated = []
-        for entry in entries:
-            data = entry.get("data")
-            if isinstance(data, dict):
-                for cid, cd in data.items():
-                    if isinstance(cd, dict) and "prices" in cd:
-                        prices = cd["prices"]
-                        if len(prices) > 10:
-                            step = max(1, len(prices) // 10)
-                            cd["prices"] = prices[::step]
-                            cd["_note"] = f"Сжато с {len(prices)} точек"
-            if isinstance(data, list) and len(data) > 5:
-                entry["data"] = data[:5]
-                entry["_note"] = "Усечено до 5"
-            truncated.append(entry)
-        return truncated
\ No newline at end of file
+    def _budget() -> int:
+        model = settings.get_agent_config("reasoner")["model"]
+        return settings.context_token_budgets.get(model, settings.max_context_tokens)
+
+    @staticmethod
+    def _series_meta(cid, cd) -> str:
+        meta = {k: v for k, v in cd.items()
+                if k not in ("prices", "coin_id") and not isinstance(v, (dict, list, tuple, PriceSeries))}
+        return f"{cid}: " + " ".join(f"{k}={_num(v)}" for k, v in meta.items())
+
+    @staticmethod
+    def _analytics_block(analytics: dict):
+        rows = [{k: _ts(v) if k.endswith("_at") else v for k, v in stats.items()}
+                for stats in analytics["series"].values()]
+        header, lines = _table(dict(zip(analytics["series"], rows)), key_name="coin")
+        block = [_Fixed("## analytics (доходности лог., волатильность — ст. откл. за шаг ряда и годовая, "
+                        "sma/ema_Nd — за N дней)"),
+                 header, *lines]
+        if analytics.get("correlation"):
+            block.append("correlation: " + " ".join(
+                f"{pair}={_num(v)}" for pair, v in analytics["correlation"].items()))
+        return block
+
+    @staticmethod
+    def _series_values(prices, budget_tokens, max_points=None):
+        series = prices if isinstance(prices, PriceSeries) else PriceSeries(
+            [p["timestamp"] for p in prices], [p["price"] for p in prices])
+        if not len(series):
+            return "prices: -", False
+        ts = series.timestamps
+        # Единица смещений для прореженного ряда — шаг исходной сетки: часы или дни
+        unit_ms = 3_600_000 if len(ts) < 2 or np.median(np.diff(ts)) < DAY_MS else DAY_MS
+        # Стоимость значения в токенах оценивается по выборке, а не по всему ряду
+        sample = [_num(p) for p in series.prices[::max(1, len(series) // 200)].tolist()]
+        per_value = max(1.0, estimate_tokens(",".join(sample)) / len(sample)) + 0.5
+        # Строки start/last и подписи колонок оплачиваются до точек
+        head = estimate_tokens(f"start={_ts(ts[0])} last={_ts(ts[-1])} (прорежено до {len(ts)} точек)\n"
+                               f"t_h: \nprices: ")
+        avail = max(0, budget_tokens - head)
+        limit = max(2, min(len(series), int(avail / per_value)))
+        if max_points:
+            limit = min(limit, max_points)
+        if len(series) > limit:
+            # У прореженного ряда шаг неравномерный: к каждой точке добавляется её смещение
+            per_offset = estimate_tokens(str((ts[-1] - ts[0]) // unit_ms)) + 0.5
+            limit = max(2, min(limit, int(avail / (per_value + per_offset))))
+        # Оценка по выборке приблизительна: пока текст не влезает в бюджет, точек становится меньше
+        while True:
+            text, thinned = DataFormatter._render_series(series, limit, unit_ms)
+            cost = estimate_tokens(text)
+            if cost <= budget_tokens or limit <= 2:
+                return text, thinned
+            limit = max(2, min(limit - 1, int(limit * budget_tokens / cost)))
+
+    @staticmethod
+    def _render_series(series, limit, unit_ms):
+        thinned = len(series) > limit
+        if thinned:
+            # Первый и последний отсчёты сохраняются, экстремумы между ними — тоже
+            series = series.downsample(limit)
+        ts = series.timestamps.tolist()
+        values = [_num(p) for p in series.prices.tolist()]
+
+        if thinned:
+            unit = "h" if unit_ms < DAY_MS else "d"
+            offsets = ",".join(str(round((t - ts[0]) / unit_ms)) for t in ts)
+            return (f"start={_ts(ts[0])} last={_ts(ts[-1])} (прорежено до {len(ts)} точек)\n"
+                    f"t_{unit}: {offsets}\nprices: {','.join(values)}", True)
+
+        # Последний отсчёт — «живая» цена вне сетки, его время указывается отдельно
+        grid = ts[:-1] if len(ts) > 2 else []
+        step = (grid[-1] - grid[0]) / (len(grid) - 1) if len(grid) > 1 else 0
+        head = f"start={_ts(ts[0])} step={_step(step)}" if step else f"start={_ts(ts[0])}"
+        return f"{head} last={_ts(ts[-1])}\nprices: {','.join(values)}", False
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import List
 
@@ -16,49 +17,61 @@ ROUTING = {
 
 
 class FetcherAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, provider: ProviderManager = None):
         super().__init__("fetcher")
-        self.provider = ProviderManager()
+        self.provider = provider or ProviderManager()
 
-    def execute(self, plan: PlanResult) -> FetchedData:
+    async def execute(self, plan: PlanResult) -> FetchedData:
         logger.info(f"[Fetcher] f={plan.functions}, c={plan.coins}, p={plan.period_days}д")
         entries, errors, source = [], [], "unknown"
         total, ok = len(plan.functions), 0
 
+        # Функции плана независимы: запускаем параллельно, порядок записей сохраняет gather
+        results = await asyncio.gather(
+            *(self._dispatch(fn, ROUTING[fn], plan) for fn in plan.functions if fn in ROUTING),
+            return_exceptions=True)
+        results = iter(results)
+
         for fn in plan.functions:
             route = ROUTING.get(fn)
             if not route:
                 errors.append(f"Нет маршрута: {fn}")
                 entries.append(DataEntry(function=fn, error=f"Нет маршрута: {fn}"))
                 continue
-            try:
-                resp = self._dispatch(fn, route, plan)
-                if not resp.success:
-                    errors.append(f"{fn}: {resp.error}")
-                    entries.append(DataEntry(function=fn, error=resp.error))
-                    continue
-                entries.append(DataEntry(function=fn, data=resp.data))
-                ok += 1
-                source = resp.source
-                c = " (кеш)" if resp.cached else ""
-                logger.info(f"[Fetcher] ✓ {fn} через {resp.source}{c} [{route['strategy'].value}]")
-            except Exception as e:
-                errors.append(f"{fn}: {e}")
-                entries.append(DataEntry(function=fn, error=str(e)))
+            resp = next(results)
+            if isinstance(resp, Exception):
+                errors.append(f"{fn}: {resp}")
+                entries.append(DataEntry(function=fn, error=str(resp)))
+                continue
+            if not resp.success:
+                errors.append(f"{fn}: {resp.error}")
+                entries.append(DataEntry(function=fn, error=resp.error))
+                continue
+            entries.append(DataEntry(function=fn, data=resp.data))
+            ok += 1
+            source = resp.source
+            c = " (устаревший кеш)" if resp.stale else " (кеш)" if resp.cached else ""
+            logger.info(f"[Fetcher] ✓ {fn} через {resp.source}{c} [{route['strategy'].value}]")
 
         return FetchedData(source=source, entries=entries, errors=errors,
                            completeness=ok / total if total else 0.0)
 
-    def _dispatch(self, fn, route, plan) -> ProviderResponse:
+    async def _dispatch(self, fn, route, plan) -> ProviderResponse:
         m, s, p = route["method"], route["strategy"], route.get("provider")
 
         if m == "get_current_prices":
-            return self.provider.dispatch(m, s, preferred_provider=p, coin_ids=plan.coins)
+            return await self.provider.adispatch(m, s, preferred_provider=p, coin_ids=plan.coins)
         if m == "get_historical_prices":
             hist, last = {}, None
-            for coin in plan.coins:
-                r = self.provider.dispatch(m, s, preferred_provider=p,
-                                           coin_id=coin, days=plan.period_days)
+            responses = await asyncio.gather(
+                *(self.provider.adispatch(m, s, preferred_provider=p,
+                                          coin_id=coin, days=plan.period_days)
+                  for coin in plan.coins),
+                return_exceptions=True)
+            for coin, r in zip(plan.coins, responses):
+                if isinstance(r, Exception):
+                    logger.warning(f"[Fetcher] {coin}: {r}")
+                    continue
                 if r.success:
                     hist[coin] = r.data
                     last = r
@@ -66,5 +79,5 @@ class FetcherAgent(BaseAgent):
                 return ProviderResponse(True, last.source if last else "unknown", hist)
             return ProviderResponse(False, "none", error="Нет исторических данных")
         if m == "get_top_coins":
-            return self.provider.dispatch(m, s, preferred_provider=p, limit=10)
+            return await self.provider.adispatch(m, s, preferred_provider=p, limit=10)
         return ProviderResponse(False, "none", error=f"Неизвестный метод: {m}")
\ No newline at end of file
@@ -0,0 +1,85 @@
+import re
+from dataclasses import dataclass, field
+from typing import List
+
+from agent.contracts import AllowedFunction
+from agent.query_matcher import EN_SUFFIX, RU_SUFFIX, get_matcher
+
+# Фрагменты regex: основа и закрытый список окончаний, совпадение только целым словом,
+# поэтому "цен" не находится в "центральный", а "почем" — в "почему"
+_ADJ = r"(?:ий|ый|ой|ая|ое|ее|ие|ые|его|ого|ей|ых|их|ым|им|ыми|ими|ую)"
+_VERB = r"(?:ся|ась|ось|ись|а|о|и)?"
+
+FUNCTION_KEYWORDS = {
+    AllowedFunction.COINGECKO_CURRENT_PRICE.value: [
+        "цен" + RU_SUFFIX, "стоит", "стоят", "стоимост(?:ь|и|ью)", "курс" + RU_SUFFIX, "поч[её]м",
+        "price" + EN_SUFFIX, "cost" + EN_SUFFIX, "worth", r"how\s+much", "quote" + EN_SUFFIX,
+    ],
+    AllowedFunction.COINGECKO_HISTORICAL.value: [
+        "динамик" + RU_SUFFIX, "истори" + RU_SUFFIX, "тренд" + RU_SUFFIX, "график" + RU_SUFFIX,
+        "изменил" + _VERB, "изменени" + RU_SUFFIX, "менял" + _VERB, "рост" + RU_SUFFIX,
+        "падени" + RU_SUFFIX,
+        "history", "historical", "trend" + EN_SUFFIX, "chart" + EN_SUFFIX, "changed",
+        "performance", r"over\s+the\s+(?:last|past)",
+    ],
+    AllowedFunction.COINGECKO_TOP_COINS.value: [
+        "топ" + RU_SUFFIX, "лидер" + RU_SUFFIX, "рейтинг" + RU_SUFFIX, "крупнейш" + _ADJ,
+        r"самые\s+популярн" + _ADJ,
+        "top", "leader" + EN_SUFFIX, "ranking" + EN_SUFFIX, "largest", "biggest",
+    ],
+}
+
+_FUNCTION_PATTERNS = {
+    fn: re.compile(r"(?<!\w)(?:" + "|".join(kws) + r")(?!\w)", re.IGNORECASE)
+    for fn, kws in FUNCTION_KEYWORDS.items()
+}
+
+NEEDS_COINS = {
+    AllowedFunction.COINGECKO_CURRENT_PRICE.value,
+    AllowedFunction.COINGECKO_HISTORICAL.value,
+}
+
+
+@dataclass
+class IntentResult:
+    functions: List[str] = field(default_factory=list)
+    coins: List[str] = field(default_factory=list)
+    period_days: int = 7
+    period_explicit: bool = False
+    confidence: float = 0.0
+
+
+class IntentClassifier:
+    """
+    Локальный разбор запроса по ключевым словам без обращения к LLM.
+    confidence близок к 1, только когда однозначно определены и функции, и монеты.
+    """
+
+    def classify(self, query: str) -> IntentResult:
+        functions = [fn for fn, pattern in _FUNCTION_PATTERNS.items() if pattern.search(query)]
+        matched = get_matcher().match(query)
+        coins, period = matched.coins, matched.period_days
+
+        # «биткоин за месяц» без глагола — это вопрос о динамике
+        if not functions and coins and period is not None:
+            functions = [AllowedFunction.COINGECKO_HISTORICAL.value]
+            confidence = 0.85
+        elif not functions:
+            return IntentResult(coins=coins, period_days=period or 7,
+                                period_explicit=period is not None, confidence=0.0)
+        else:
+            # «курс эфира за год»: явный период у вопроса о цене означает динамику за период
+            if (period is not None
+                    and AllowedFunction.COINGECKO_CURRENT_PRICE.value in functions
+                    and AllowedFunction.COINGECKO_HISTORICAL.value not in functions):
+                functions.append(AllowedFunction.COINGECKO_HISTORICAL.value)
+            # Без монет или без периода для истории порог rules-пути не проходится
+            confidence = 0.5
+            if coins or not NEEDS_COINS.intersection(functions):
+                confidence += 0.3
+            if (AllowedFunction.COINGECKO_HISTORICAL.value not in functions
+                    or period is not None):
+                confidence += 0.2
+
+        return IntentResult(functions=functions, coins=coins, period_days=period or 7,
+                            period_explicit=period is not None, confidence=round(confidence, 2))
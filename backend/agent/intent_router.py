@@ -0,0 +1,171 @@
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+from agent.contracts import AllowedFunction
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Размеченные примеры запросов: запрос относится к функции ближайших по смыслу примеров
+EXAMPLE_QUERIES = {
+    AllowedFunction.COINGECKO_CURRENT_PRICE.value: [
+        "Сколько сейчас стоит биткоин?",
+        "Какая цена у эфира?",
+        "Почём нынче солана",
+        "Текущий курс XRP к доллару",
+        "Во сколько оценивается монета сейчас",
+        "What is the price of bitcoin right now?",
+        "How much is one ETH worth today",
+        "current BTC quote",
+    ],
+    AllowedFunction.COINGECKO_HISTORICAL.value: [
+        "Как менялся курс биткоина за последний месяц?",
+        "Покажи динамику эфира за неделю",
+        "Насколько выросла солана за год",
+        "История цены доги за 30 дней",
+        "Тренд кардано за квартал",
+        "Упал ли биткоин за последние дни",
+        "How did ethereum perform over the last week?",
+        "bitcoin price history for 90 days",
+    ],
+    AllowedFunction.COINGECKO_TOP_COINS.value: [
+        "Топ-10 криптовалют по капитализации",
+        "Какие монеты сейчас самые крупные?",
+        "Покажи рейтинг криптовалют",
+        "Лидеры рынка криптовалют",
+        "Какие монеты самые популярные",
+        "Что входит в первую двадцатку по капитализации",
+        "top 5 coins by market cap",
+        "largest cryptocurrencies today",
+    ],
+}
+
+
+class EmbeddingIntentRouter:
+    """
+    Локальный классификатор функций по эмбеддингам: запрос кодируется небольшой
+    моделью sentence-transformers на CPU и сравнивается (косинус) с банком примеров,
+    функция выбирается голосованием k ближайших.
+
+    Модель загружается при первом запросе и одна на процесс. Кодирование идёт
+    в отдельном потоке: одновременные запросы собираются в пакет и кодируются одним вызовом.
+    Без sentence-transformers роутер отключается, планировщик работает как раньше.
+    """
+
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or settings.intent_router_model
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._model = None
+        self._bank = None
+        self._labels: List[str] = []
+        self.available = True
+
+    async def aroute(self, query: str) -> Optional[Tuple[str, float]]:
+        """(функция, сходство) или None, если роутер недоступен или не уверен."""
+        if not self.available:
+            return None
+        fut: Future = Future()
+        self._ensure_worker()
+        self._queue.put((query, fut))
+        try:
+            return await asyncio.wrap_future(fut)
+        except Exception as e:
+            logger.warning(f"[IntentRouter] Ошибка: {e}")
+            return None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="intent-router", daemon=True)
+                self._worker.start()
+
+    def _load(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            logger.warning("[IntentRouter] sentence-transformers не установлен, роутер отключён")
+            self.available = False
+            return False
+
+        logger.info(f"[IntentRouter] Загрузка модели {self.model_name}")
+        self._model = SentenceTransformer(self.model_name, device="cpu")
+        texts = []
+        for fn, examples in EXAMPLE_QUERIES.items():
+            texts.extend(examples)
+            self._labels.extend([fn] * len(examples))
+        self._bank = self._encode(texts)
+        return True
+
+    def _encode(self, texts):
+        return self._model.encode(texts, batch_size=settings.intent_router_batch_size,
+                                  normalize_embeddings=True, convert_to_numpy=True)
+
+    def _run(self):
+        try:
+            loaded = self._load()
+        except Exception as e:
+            logger.error(f"[IntentRouter] Модель не загружена: {e}")
+            self.available, loaded = False, False
+
+        while True:
+            batch = [self._queue.get()]
+            if not loaded:
+                self._resolve(batch[0][1], None)
+                continue
+            # Всё, что успело прийти за окно ожидания, кодируется одним вызовом
+            try:
+                while len(batch) < settings.intent_router_batch_size:
+                    batch.append(self._queue.get(timeout=settings.intent_router_batch_window))
+            except queue.Empty:
+                pass
+            try:
+                results = self._classify([q for q, _ in batch])
+                for (_, fut), result in zip(batch, results):
+                    self._resolve(fut, result)
+            except Exception as e:
+                for _, fut in batch:
+                    self._resolve(fut, error=e)
+
+    @staticmethod
+    def _resolve(fut: Future, result=None, error: Optional[Exception] = None):
+        # Ожидающий мог быть отменён (клиент отключился) — такой результат просто выбрасываем
+        if not fut.set_running_or_notify_cancel():
+            return
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    def _classify(self, queries: List[str]) -> List[Optional[Tuple[str, float]]]:
+        scores = self._encode(queries) @ self._bank.T
+        k = min(settings.intent_router_k, scores.shape[1])
+        results = []
+        for row in scores:
+            nearest = row.argsort()[::-1][:k]
+            votes = {}
+            for i in nearest:
+                votes[self._labels[i]] = votes.get(self._labels[i], 0.0) + float(row[i])
+            fn = max(votes, key=votes.get)
+            best = max(float(row[i]) for i in nearest if self._labels[i] == fn)
+            results.append((fn, round(best, 3))
+                           if best >= settings.intent_router_min_similarity else None)
+        return results
+
+
+_router: Optional[EmbeddingIntentRouter] = None
+
+
+def get_intent_router() -> Optional[EmbeddingIntentRouter]:
+    """Общий экземпляр на процесс; None, если роутер выключен в настройках."""
+    global _router
+    if not settings.intent_router_enabled:
+        return None
+    if _router is None:
+        _router = EmbeddingIntentRouter()
+    return _router
@@ -1,36 +1,132 @@
 import json
 import re
 import logging
-from typing import List
+from typing import List, Optional
 
 from agent.base_agent import BaseAgent
-from agent.contracts import PlanResult, VALID_COINS, COIN_ALIASES, PERIOD_KEYWORDS, AllowedFunction
+from agent.coin_registry import coin_registry
+from cache import plan_cache, MISS
+from agent.contracts import PlanResult, VALID_COINS, AllowedFunction
+from agent.intent_classifier import IntentClassifier, IntentResult, NEEDS_COINS
+from agent.intent_router import get_intent_router
+from agent.query_matcher import match_coins
+from settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Пунктуация, кроме точки и запятой внутри чисел ("1.5", "0,25")
+_PUNCT = re.compile(r"(?:(?<!\d)[.,]|[.,](?!\d)|[^\w\s.,])+")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(_PUNCT.sub(" ", query.casefold()).split())
+
 
 class PlannerAgent(BaseAgent):
     def __init__(self):
         super().__init__("planner")
+        self.classifier = IntentClassifier()
+        self.router = get_intent_router()
 
-    def execute(self, user_query: str) -> PlanResult:
+    async def execute(self, user_query: str) -> PlanResult:
         logger.info(f"[Planner] Запрос: {user_query}")
-        functions = self._determine_functions(user_query)
-        coins = self._determine_coins(user_query)
-        period = self._determine_period(user_query)
+        key = normalize_query(user_query)
+        cached = plan_cache.get("plans", key)
+        if cached is not MISS:
+            logger.info(f"[Planner] План из кэша: f={cached.functions}, c={cached.coins}, "
+                        f"p={cached.period_days}д")
+            return cached.model_copy(update={"original_query": user_query, "planner_path": "cache"})
+
+        intent = self.classifier.classify(user_query)
+        plan = None
+        if intent.confidence >= settings.planner_rules_min_confidence:
+            functions, coins, path = intent.functions, intent.coins or ["bitcoin"], "rules"
+        else:
+            routed = await self._route_locally(user_query, intent)
+            if routed is not None:
+                functions, coins, path = [routed], intent.coins or ["bitcoin"], "embeddings"
+            elif settings.planner_structured:
+                plan = await self._plan_structured(user_query, intent)
+            if routed is None and plan is None:
+                functions = await self._determine_functions(user_query)
+                coins = await self._determine_coins(user_query)
+                path = "llm"
 
         try:
-            plan = PlanResult(functions=functions, coins=coins,
-                              period_days=period, original_query=user_query)
+            plan = plan or PlanResult(functions=functions, coins=coins, period_days=intent.period_days,
+                                      original_query=user_query, planner_path=path,
+                                      confidence=intent.confidence)
         except Exception as e:
             logger.warning(f"[Planner] Ошибка валидации: {e}, используем значения по умолчанию")
             plan = PlanResult(functions=["coingecko_current_price"],
-                              coins=["bitcoin"], period_days=7, original_query=user_query)
+                              coins=["bitcoin"], period_days=7, original_query=user_query,
+                              planner_path="default", confidence=intent.confidence)
 
-        logger.info(f"[Planner] План: f={plan.functions}, c={plan.coins}, p={plan.period_days}д")
+        logger.info(f"[Planner] План ({plan.planner_path}, уверенность {intent.confidence}): "
+                    f"f={plan.functions}, c={plan.coins}, p={plan.period_days}д")
+        # Запасной план после ошибки валидации не кэшируем — в следующий раз может получиться лучше
+        if plan.planner_path != "default":
+            plan_cache.set("plans", key, plan)
         return plan
 
-    def _determine_functions(self, query: str) -> List[str]:
+    async def _route_locally(self, query: str, intent: IntentResult) -> Optional[str]:
+        """Функция от роутера по эмбеддингам — только если монеты найдены локально или не нужны."""
+        if self.router is None:
+            return None
+        routed = await self.router.aroute(query)
+        if routed is None:
+            return None
+        fn, similarity = routed
+        if fn in NEEDS_COINS and not intent.coins:
+            return None
+        logger.info(f"[Planner] Роутер по эмбеддингам: {fn} (сходство {similarity})")
+        return fn
+
+    async def _plan_structured(self, query: str, intent: IntentResult) -> Optional[PlanResult]:
+        """Весь план одним запросом в JSON-режиме. None — ответ не разобран, нужен прежний путь."""
+        allowed = [f.value for f in AllowedFunction]
+        prompt = (
+            f"Составь план ответа на запрос о криптовалютах.\n"
+            f"ФУНКЦИИ: {json.dumps(allowed)}\n"
+            f"- 'цена', 'стоит' → coingecko_current_price\n"
+            f"- 'динамика', 'история', 'тренд' → coingecko_historical_prices\n"
+            f"- 'топ', 'лидеры', 'рейтинг' → coingecko_top_coins\n"
+            f"МОНЕТЫ (id CoinGecko): {json.dumps(VALID_COINS[:20])}...\n"
+            f"Верни ТОЛЬКО JSON-объект: "
+            f'{{"functions": [...], "coins": [...], "period_days": число от 1 до 365}}\n'
+            f"Если монета не ясна — [\"bitcoin\"], если период не указан — 7.\n\n"
+            f"Запрос: {query}"
+        )
+        try:
+            data = json.loads(await self._call_llm(prompt, json_mode=True))
+        except Exception as e:
+            logger.warning(f"[Planner] Структурированный план не получен: {e}")
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        functions = [f for f in map(str, data.get("functions") or []) if f in allowed]
+        if not functions:
+            return None
+        coins = intent.coins or self._resolve_coins(data.get("coins") or [])
+        period = intent.period_days
+        if not intent.period_explicit:
+            try:
+                period = int(data.get("period_days") or period)
+            except (TypeError, ValueError):
+                pass
+            if not 0 < period <= 365:
+                period = intent.period_days
+
+        try:
+            return PlanResult(functions=functions, coins=coins or ["bitcoin"], period_days=period,
+                              original_query=query, planner_path="llm_json",
+                              confidence=intent.confidence)
+        except Exception as e:
+            logger.warning(f"[Planner] Структурированный план не прошёл валидацию: {e}")
+            return None
+
+    async def _determine_functions(self, query: str) -> List[str]:
         allowed = [f.value for f in AllowedFunction]
         prompt = (
             f"Определи функции API для ответа на запрос.\n"
@@ -42,22 +138,15 @@ class PlannerAgent(BaseAgent):
             f"- Верни ТОЛЬКО JSON-список\n\n"
             f"Запрос: {query}"
         )
-        response = self._call_llm(prompt)
+        response = await self._call_llm(prompt)
         functions = self._parse_list(response)
         valid = [f for f in functions if f in allowed]
         return valid or ["coingecko_current_price"]
 
-    def _determine_coins(self, query: str) -> List[str]:
-        query_lower = query.lower()
-        found = set()
-        for alias, coin_id in COIN_ALIASES.items():
-            if alias in query_lower:
-                found.add(coin_id)
-        for coin in VALID_COINS:
-            if coin in query_lower:
-                found.add(coin)
+    async def _determine_coins(self, query: str) -> List[str]:
+        found = match_coins(query)
         if found:
-            return list(found)
+            return found
 
         prompt = (
             f"Определи криптовалюты из запроса.\n"
@@ -66,23 +155,15 @@ class PlannerAgent(BaseAgent):
             f"Запрос: {query}"
         )
         try:
-            response = self._call_llm(prompt)
-            coins = self._parse_list(response)
-            valid = [c for c in coins if c in VALID_COINS]
-            return valid or ["bitcoin"]
+            response = await self._call_llm(prompt)
+            return self._resolve_coins(self._parse_list(response)) or ["bitcoin"]
         except Exception:
             return ["bitcoin"]
 
-    def _determine_period(self, query: str) -> int:
-        query_lower = query.lower()
-        for kw, days in PERIOD_KEYWORDS.items():
-            if kw in query_lower:
-                return days
-        match = re.search(r'(\d+)\s*(?:дн|день|дня)', query_lower)
-        if match:
-            d = int(match.group(1))
-            if 0 < d <= 365: return d
-        return 7
+    @staticmethod
+    def _resolve_coins(terms) -> List[str]:
+        resolved = (coin_registry.resolve(str(t)) for t in terms)
+        return list(dict.fromkeys(c for c in resolved if c))
 
     @staticmethod
     def _parse_list(text: str) -> list:
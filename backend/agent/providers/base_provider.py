@@ -1,8 +1,15 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import List, Optional, Set, Any
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Any, Callable, List, Optional, Set
 from enum import Enum
 
+from agent.providers.singleflight import upstream_flight
+from cache import market_cache, MISS
+
+# Опережающее обновление: кэш не читается, данные всегда запрашиваются заново
+REFRESH_AHEAD: ContextVar[bool] = ContextVar("refresh_ahead", default=False)
+
 
 class FetchStrategy(Enum):
     FALLBACK = "fallback"
@@ -33,6 +40,7 @@ class ProviderResponse:
     data: Any = None
     error: Optional[str] = None
     cached: bool = False
+    stale: bool = False
 
 
 class CryptoDataProvider(ABC):
@@ -50,8 +58,11 @@ class CryptoDataProvider(ABC):
     def get_capabilities(self) -> Set[DataCapability]:
         pass
 
-    @abstractmethod
     def get_status(self) -> ProviderStatus:
+        return self.health.status
+
+    @abstractmethod
+    def probe(self) -> ProviderStatus:
         pass
 
     @abstractmethod
@@ -64,4 +75,40 @@ class CryptoDataProvider(ABC):
 
     @abstractmethod
     def get_top_coins(self, limit: int = 10, vs_currency: str = "usd") -> ProviderResponse:
-        pass
\ No newline at end of file
+        pass
+
+    def list_coins(self) -> ProviderResponse:
+        """Полный список монет провайдера для реестра монет."""
+        return ProviderResponse(False, self.name, error="Список монет не поддерживается")
+
+    def close(self) -> None:
+        pass
+
+    def _cached(self, namespace: str, key: tuple, fetch: Callable[[], ProviderResponse]) -> ProviderResponse:
+        cache_key = (self.name,) + key
+
+        def fetch_and_store():
+            resp = fetch()
+            if resp.success:
+                # Первый вызывающий получает тот же неизменяемый снимок, что и все последующие
+                resp = replace(resp, data=market_cache.set(namespace, cache_key, resp.data))
+            return resp
+
+        data, stale = (MISS, False) if REFRESH_AHEAD.get() else market_cache.lookup(namespace, cache_key)
+        if data is not MISS:
+            if stale:
+                # Отдаём устаревшее значение сразу, обновление — одно на ключ, в фоне
+                upstream_flight.spawn((namespace, cache_key), fetch_and_store)
+            return ProviderResponse(True, self.name, data, cached=True, stale=stale)
+
+        # Одновременные промахи по одному ключу идут в апстрим одним запросом
+        return upstream_flight.do((namespace, cache_key), fetch_and_store)
+
+    def _cached_top(self, limit: int, vs_currency: str, superset: int,
+                    fetch: Callable[[int], ProviderResponse]) -> ProviderResponse:
+        # Кэшируется один расширенный список на валюту, любой меньший limit — его срез
+        size = max(limit, superset)
+        resp = self._cached("top", (size, vs_currency), lambda: fetch(size))
+        if resp.success and len(resp.data) > limit:
+            return replace(resp, data=resp.data[:limit])
+        return resp
\ No newline at end of file
@@ -1,8 +1,7 @@
 import os
 import time
-import hashlib
 import logging
-import requests
+import httpx
 from typing import List, Set
 
 from agent.providers.base_provider import (
@@ -10,25 +9,15 @@ from agent.providers.base_provider import (
     ProviderResponse,
     ProviderStatus,
     DataCapability,
+    REFRESH_AHEAD,
 )
+from agent.providers.health import CircuitBreaker
+from agent.providers.http_client import create_http_client
+from agent.providers.series_store import PriceHistory, STEP_MS, series_store
+from agent.providers.singleflight import upstream_flight
 from settings import settings
 
 logger = logging.getLogger(__name__)
-_cache = {}
-
-
-def _get_cached(key, ttl):
-    if key in _cache and time.time() - _cache[key]["time"] < ttl:
-        return _cache[key]["data"]
-    return None
-
-
-def _set_cached(key, data):
-    _cache[key] = {"data": data, "time": time.time()}
-
-
-def _cache_key(prefix, *args):
-    return hashlib.md5(f"{prefix}:{args}".encode()).hexdigest()
 
 
 class CoinGeckoProvider(CryptoDataProvider):
@@ -43,6 +32,9 @@ class CoinGeckoProvider(CryptoDataProvider):
         else:
             logger.info("CoinGecko: бесплатный режим (без ключа)")
 
+        self._client = create_http_client(headers=self._headers())
+        self.health = CircuitBreaker(self.name)
+
     def _headers(self):
         """
         Заголовки для CoinGecko.
@@ -55,17 +47,17 @@ class CoinGeckoProvider(CryptoDataProvider):
     def _request(self, url, params=None):
         """
         HTTP GET с retry, backoff и подробным логированием ошибок.
+        При разомкнутой цепи запрос не отправляется.
         """
         for attempt in range(settings.api_max_retries):
+            if not self.health.allow_request():
+                return {"_error": f"{self.name}: цепь разомкнута ({self.get_status().value}), "
+                                  f"запрос в апстрим пропущен"}
             try:
-                resp = requests.get(
-                    url,
-                    params=params,
-                    headers=self._headers(),
-                    timeout=settings.api_request_timeout,
-                )
+                resp = self._client.get(url, params=params)
 
                 if resp.status_code == 429:
+                    self.health.record_failure(ProviderStatus.RATE_LIMITED, "HTTP 429")
                     wait = settings.api_backoff_base * (2 ** attempt)
                     logger.warning(
                         f"CoinGecko 429 Too Many Requests. "
@@ -74,6 +66,12 @@ class CoinGeckoProvider(CryptoDataProvider):
                     time.sleep(wait)
                     continue
 
+                if resp.status_code >= 500:
+                    self.health.record_failure(ProviderStatus.UNAVAILABLE,
+                                               f"HTTP {resp.status_code}")
+                else:
+                    self.health.record_success()
+
                 if resp.status_code >= 400:
                     logger.error(
                         f"CoinGecko HTTP {resp.status_code}. "
@@ -83,17 +81,20 @@ class CoinGeckoProvider(CryptoDataProvider):
 
                 return resp.json()
 
-            except requests.exceptions.Timeout:
+            except httpx.TimeoutException:
+                self.health.record_failure(ProviderStatus.UNAVAILABLE, "timeout")
                 logger.warning(
                     f"CoinGecko таймаут ({attempt + 1}/{settings.api_max_retries})"
                 )
-            except requests.exceptions.ConnectionError as e:
+            except httpx.TransportError as e:
+                self.health.record_failure(ProviderStatus.UNAVAILABLE, str(e))
                 logger.warning(
                     f"CoinGecko ошибка соединения "
                     f"({attempt + 1}/{settings.api_max_retries}): {e}"
                 )
             except Exception as e:
                 logger.error(f"CoinGecko unexpected error: {e}")
+                self.health.release_trial()
                 return {"_error": str(e)}
 
             if attempt < settings.api_max_retries - 1:
@@ -101,6 +102,9 @@ class CoinGeckoProvider(CryptoDataProvider):
 
         return {"_error": f"Превышено число попыток ({settings.api_max_retries})"}
 
+    def close(self):
+        self._client.close()
+
     @property
     def name(self):
         return "coingecko"
@@ -117,13 +121,9 @@ class CoinGeckoProvider(CryptoDataProvider):
             DataCapability.GLOBAL_METRICS,
         }
 
-    def get_status(self) -> ProviderStatus:
+    def probe(self) -> ProviderStatus:
         try:
-            r = requests.get(
-                f"{self.BASE}/ping",
-                headers=self._headers(),
-                timeout=5,
-            )
+            r = self._client.get(f"{self.BASE}/ping", timeout=5)
 
             if r.status_code == 200:
                 return ProviderStatus.AVAILABLE
@@ -140,12 +140,17 @@ class CoinGeckoProvider(CryptoDataProvider):
             logger.error(f"CoinGecko status check failed: {e}")
             return ProviderStatus.UNAVAILABLE
 
+    def list_coins(self):
+        raw = self._request(f"{self.BASE}/coins/list")
+        if isinstance(raw, dict) and "_error" in raw:
+            return ProviderResponse(False, self.name, error=raw["_error"])
+        return ProviderResponse(True, self.name, raw)
+
     def get_current_prices(self, coin_ids, vs_currency="usd"):
-        key = _cache_key("cg_prices", ",".join(sorted(coin_ids)), vs_currency)
-        cached = _get_cached(key, settings.cache_ttl_prices)
-        if cached:
-            return ProviderResponse(True, self.name, cached, cached=True)
+        return self._cached("prices", (",".join(sorted(coin_ids)), vs_currency),
+                            lambda: self._fetch_current_prices(coin_ids, vs_currency))
 
+    def _fetch_current_prices(self, coin_ids, vs_currency):
         raw = self._request(
             f"{self.BASE}/simple/price",
             {
@@ -172,30 +177,82 @@ class CoinGeckoProvider(CryptoDataProvider):
                     "source": "coingecko",
                 }
 
-        _set_cached(key, result)
         return ProviderResponse(True, self.name, result)
 
     def get_historical_prices(self, coin_id, vs_currency="usd", days=7):
-        key = _cache_key("cg_hist", coin_id, vs_currency, days)
-        cached = _get_cached(key, settings.cache_ttl_historical)
-        if cached:
-            return ProviderResponse(True, self.name, cached, cached=True)
-
-        raw = self._request(
-            f"{self.BASE}/coins/{coin_id}/market_chart",
-            {
-                "vs_currency": vs_currency,
-                "days": days,
-                "interval": "daily" if days > 1 else "hourly",
-            },
-        )
-
-        if "_error" in raw:
-            return ProviderResponse(False, self.name, error=raw["_error"])
-        if "prices" not in raw:
-            return ProviderResponse(False, self.name, error="Нет поля 'prices'")
-
-        prices = [{"timestamp": int(ts), "price": float(p)} for ts, p in raw["prices"]]
+        """
+        Ответ строится срезом локального ряда. Если ряд покрывает окно, но устарел —
+        догружается только хвост с последнего отсчёта; полная загрузка — только
+        когда запрошено окно длиннее сохранённого.
+        """
+        interval = "daily" if days > 1 else "hourly"
+        key = (self.name, coin_id, vs_currency, interval)
+
+        # Все окна монеты живут в одной записи хранилища, поэтому и загрузка одна на ряд
+        flight = ("series", key)
+        refresh = lambda: self._refresh_series(key, coin_id, vs_currency, days, interval)
+        series = series_store.get(key)
+        if series is not None and series.covers(days) and not REFRESH_AHEAD.get():
+            if series.is_fresh():
+                return ProviderResponse(True, self.name,
+                                        self._history_result(coin_id, days, series), cached=True)
+            if series.is_servable_stale():
+                upstream_flight.spawn(flight, refresh)
+                return ProviderResponse(True, self.name, self._history_result(coin_id, days, series),
+                                        cached=True, stale=True)
+
+        result = upstream_flight.do(flight, refresh)
+        if not isinstance(result, ProviderResponse) and not result.covers(days):
+            # Присоединились к загрузке более короткого окна — догружаем своё поверх неё
+            result = upstream_flight.do(flight, refresh)
+        if isinstance(result, ProviderResponse):
+            return result
+        return ProviderResponse(True, self.name, self._history_result(coin_id, days, result))
+
+    def _refresh_series(self, key, coin_id, vs_currency, days, interval):
+        series = series_store.get(key)
+        if (series is not None and series.covers(days) and series.is_fresh()
+                and not REFRESH_AHEAD.get()):
+            return series
+
+        if series is not None and series.covers(days) and len(series.series):
+            raw = self._request(
+                f"{self.BASE}/coins/{coin_id}/market_chart/range",
+                {
+                    "vs_currency": vs_currency,
+                    "from": series.last_ts // 1000,
+                    "to": int(time.time()),
+                },
+            )
+            if "_error" in raw:
+                return ProviderResponse(False, self.name, error=raw["_error"])
+            if "prices" not in raw:
+                return ProviderResponse(False, self.name, error="Нет поля 'prices'")
+            series = series.with_tail(raw["prices"])
+            logger.info(f"CoinGecko: {coin_id} дозагружен хвост, {len(raw['prices'])} точек")
+        else:
+            window = max(days, series.days if series is not None else 0)
+            raw = self._request(
+                f"{self.BASE}/coins/{coin_id}/market_chart",
+                {
+                    "vs_currency": vs_currency,
+                    "days": window,
+                    "interval": interval,
+                },
+            )
+            if "_error" in raw:
+                return ProviderResponse(False, self.name, error=raw["_error"])
+            if "prices" not in raw:
+                return ProviderResponse(False, self.name, error="Нет поля 'prices'")
+            series = PriceHistory.from_raw(raw["prices"], window, STEP_MS[interval])
+
+        series_store.put(key, series)
+        return series
+
+    @staticmethod
+    def _history_result(coin_id, days, series):
+        # prices — PriceSeries: срез сохранённого ряда без копирования точек
+        prices = series.slice(days)
         result = {
             "coin_id": coin_id,
             "period_days": days,
@@ -203,21 +260,17 @@ class CoinGeckoProvider(CryptoDataProvider):
             "source": "coingecko",
         }
 
-        if len(prices) >= 2 and prices[0]["price"] != 0:
-            result["change_percent"] = round(
-                (prices[-1]["price"] - prices[0]["price"]) / prices[0]["price"] * 100,
-                2,
-            )
+        change = prices.change_percent()
+        if change is not None:
+            result["change_percent"] = change
 
-        _set_cached(key, result)
-        return ProviderResponse(True, self.name, result)
+        return result
 
     def get_top_coins(self, limit=10, vs_currency="usd"):
-        key = _cache_key("cg_top", limit, vs_currency)
-        cached = _get_cached(key, settings.cache_ttl_top)
-        if cached:
-            return ProviderResponse(True, self.name, cached, cached=True)
+        return self._cached_top(limit, vs_currency, settings.top_coins_superset,
+                                lambda size: self._fetch_top_coins(size, vs_currency))
 
+    def _fetch_top_coins(self, limit, vs_currency):
         raw = self._request(
             f"{self.BASE}/coins/markets",
             {
@@ -249,5 +302,4 @@ class CoinGeckoProvider(CryptoDataProvider):
             for c in raw
         ]
 
-        _set_cached(key, result)
         return ProviderResponse(True, self.name, result)
\ No newline at end of file
@@ -1,45 +1,18 @@
 import os
 import time
-import hashlib
 import logging
-import requests
+import httpx
 from typing import List, Set
 
+from agent.coin_registry import coin_registry
 from agent.providers.base_provider import (
     CryptoDataProvider, ProviderResponse, ProviderStatus, DataCapability,
 )
+from agent.providers.health import CircuitBreaker
+from agent.providers.http_client import create_http_client
 from settings import settings
 
 logger = logging.getLogger(__name__)
-_cache = {}
-
-CG_TO_CMC = {
-    "bitcoin": "BTC", "ethereum": "ETH", "tether": "USDT",
-    "bnb": "BNB", "solana": "SOL", "ripple": "XRP",
-    "dogecoin": "DOGE", "cardano": "ADA", "tron": "TRX",
-    "avalanche": "AVAX", "shiba-inu": "SHIB", "polkadot": "DOT",
-    "litecoin": "LTC", "chainlink": "LINK", "uniswap": "UNI",
-    "stellar": "XLM", "monero": "XMR", "near": "NEAR",
-    "cosmos": "ATOM", "filecoin": "FIL", "aptos": "APT",
-    "arbitrum": "ARB", "optimism": "OP", "aave": "AAVE",
-    "algorand": "ALGO", "fantom": "FTM", "eos": "EOS",
-    "bitcoin-cash": "BCH",
-}
-CMC_TO_CG = {v: k for k, v in CG_TO_CMC.items()}
-
-
-def _get_cached(key, ttl):
-    if key in _cache and time.time() - _cache[key]["time"] < ttl:
-        return _cache[key]["data"]
-    return None
-
-
-def _set_cached(key, data):
-    _cache[key] = {"data": data, "time": time.time()}
-
-
-def _cache_key(prefix, *args):
-    return hashlib.md5(f"{prefix}:{args}".encode()).hexdigest()
 
 
 class CoinMarketCapProvider(CryptoDataProvider):
@@ -47,6 +20,11 @@ class CoinMarketCapProvider(CryptoDataProvider):
 
     def __init__(self):
         self.api_key = os.getenv("CMC_API_KEY")
+        self._client = create_http_client(headers=self._headers())
+        self.health = CircuitBreaker(self.name)
+
+    def close(self):
+        self._client.close()
 
     @property
     def name(self): return "coinmarketcap"
@@ -59,10 +37,13 @@ class CoinMarketCapProvider(CryptoDataProvider):
                 DataCapability.CMC_RANK, DataCapability.GLOBAL_METRICS}
 
     def get_status(self) -> ProviderStatus:
+        if not self.api_key: return ProviderStatus.NO_API_KEY
+        return super().get_status()
+
+    def probe(self) -> ProviderStatus:
         if not self.api_key: return ProviderStatus.NO_API_KEY
         try:
-            r = requests.get(f"{self.BASE}/v1/key/info",
-                             headers=self._headers(), timeout=5)
+            r = self._client.get(f"{self.BASE}/v1/key/info", timeout=5)
             if r.status_code == 200: return ProviderStatus.AVAILABLE
             if r.status_code == 429: return ProviderStatus.RATE_LIMITED
             return ProviderStatus.UNAVAILABLE
@@ -75,28 +56,39 @@ class CoinMarketCapProvider(CryptoDataProvider):
     def _request(self, url, params=None):
         if not self.api_key: return {"_error": "CMC_API_KEY не настроен"}
         for attempt in range(settings.api_max_retries):
+            if not self.health.allow_request():
+                return {"_error": f"{self.name}: цепь разомкнута ({self.get_status().value}), "
+                                  f"запрос в апстрим пропущен"}
             try:
-                r = requests.get(url, params=params, headers=self._headers(),
-                                 timeout=settings.api_request_timeout)
+                r = self._client.get(url, params=params)
                 if r.status_code == 429:
+                    self.health.record_failure(ProviderStatus.RATE_LIMITED, "HTTP 429")
                     time.sleep(settings.api_backoff_base * (2 ** attempt))
                     continue
+                if r.status_code >= 500:
+                    self.health.record_failure(ProviderStatus.UNAVAILABLE, f"HTTP {r.status_code}")
+                else:
+                    self.health.record_success()
                 r.raise_for_status()
                 return r.json()
             except Exception as e:
+                if isinstance(e, httpx.TransportError):
+                    self.health.record_failure(ProviderStatus.UNAVAILABLE, str(e))
+                else:
+                    self.health.release_trial()
                 if attempt == settings.api_max_retries - 1:
                     return {"_error": str(e)}
                 time.sleep(settings.api_backoff_base * (2 ** attempt))
         return {"_error": "Превышено число попыток"}
 
     def get_current_prices(self, coin_ids, vs_currency="usd"):
-        key = _cache_key("cmc_prices", ",".join(sorted(coin_ids)))
-        cached = _get_cached(key, settings.cache_ttl_prices)
-        if cached: return ProviderResponse(True, self.name, cached, cached=True)
+        return self._cached("prices", (",".join(sorted(coin_ids)), vs_currency),
+                            lambda: self._fetch_current_prices(coin_ids, vs_currency))
 
+    def _fetch_current_prices(self, coin_ids, vs_currency):
         symbols, id_map = [], {}
         for cg_id in coin_ids:
-            sym = CG_TO_CMC.get(cg_id, cg_id.upper())
+            sym = coin_registry.cmc_symbol(cg_id)
             symbols.append(sym)
             id_map[sym] = cg_id
 
@@ -122,18 +114,26 @@ class CoinMarketCapProvider(CryptoDataProvider):
                 "circulating_supply": cd.get("circulating_supply"),
                 "source": "coinmarketcap",
             }
-        _set_cached(key, result)
         return ProviderResponse(True, self.name, result)
 
+    def list_coins(self):
+        raw = self._request(f"{self.BASE}/v1/cryptocurrency/map", {"listing_status": "active"})
+        if "_error" in raw:
+            return ProviderResponse(False, self.name, error=raw["_error"])
+        return ProviderResponse(True, self.name, [
+            {"slug": c.get("slug"), "symbol": c.get("symbol"), "name": c.get("name"),
+             "rank": c.get("rank")} for c in raw.get("data", [])])
+
     def get_historical_prices(self, coin_id, vs_currency="usd", days=7):
         return ProviderResponse(False, self.name,
                                 error="Исторические данные CMC только на платном тарифе")
 
     def get_top_coins(self, limit=10, vs_currency="usd"):
-        key = _cache_key("cmc_top", limit, vs_currency)
-        cached = _get_cached(key, settings.cache_ttl_top)
-        if cached: return ProviderResponse(True, self.name, cached, cached=True)
+        # CMC списывает кредит за каждые 200 записей listings/latest
+        return self._cached_top(limit, vs_currency, min(settings.top_coins_superset, 200),
+                                lambda size: self._fetch_top_coins(size, vs_currency))
 
+    def _fetch_top_coins(self, limit, vs_currency):
         raw = self._request(f"{self.BASE}/v1/cryptocurrency/listings/latest",
                             {"start": "1", "limit": str(limit), "convert": vs_currency.upper()})
         if "_error" in raw:
@@ -148,7 +148,7 @@ class CoinMarketCapProvider(CryptoDataProvider):
             sym = c.get("symbol", "")
             result.append({
                 "rank": c.get("cmc_rank", 0),
-                "coin_id": CMC_TO_CG.get(sym, sym.lower()),
+                "coin_id": coin_registry.from_cmc_symbol(sym) or sym.lower(),
                 "symbol": sym, "name": c.get("name", ""),
                 "price_usd": q.get("price", 0),
                 "market_cap_usd": q.get("market_cap", 0),
@@ -157,5 +157,4 @@ class CoinMarketCapProvider(CryptoDataProvider):
                 "cmc_rank": c.get("cmc_rank"),
                 "source": "coinmarketcap",
             })
-        _set_cached(key, result)
         return ProviderResponse(True, self.name, result)
\ No newline at end of file
@@ -0,0 +1,166 @@
+import time
+import asyncio
+import logging
+import threading
+from enum import Enum
+from typing import Optional
+
+from agent.providers.base_provider import ProviderStatus
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Состояние провайдера, выученное по исходам реальных запросов.
+    CLOSED — запросы идут; OPEN — запросы в апстрим не отправляются до конца паузы;
+    HALF_OPEN — пропускается один пробный запрос, его исход закрывает или снова открывает цепь.
+    Проверяется только перед сетевым запросом: ответы из кэша цепь не затрагивает.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.last_status = ProviderStatus.AVAILABLE
+        self.last_error: Optional[str] = None
+        self.last_outcome_at: Optional[float] = None
+        self.opened_at: Optional[float] = None
+        self._open_for = 0.0
+        self._trial_started: Optional[float] = None
+
+    @property
+    def status(self) -> ProviderStatus:
+        if self.state == BreakerState.CLOSED:
+            return ProviderStatus.AVAILABLE
+        return self.last_status
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            now = time.time()
+            if self.state == BreakerState.CLOSED:
+                return True
+            if self.state == BreakerState.OPEN:
+                if now - self.opened_at < self._open_for:
+                    return False
+                self._set_state(BreakerState.HALF_OPEN)
+            # В HALF_OPEN одновременно идёт только одна проба; зависшая проба истекает по таймауту
+            if self._trial_started and now - self._trial_started < settings.api_request_timeout:
+                return False
+            self._trial_started = now
+            return True
+
+    def release_trial(self):
+        """Проба завершилась без исхода (ошибка не апстрима) — слот пробы освобождается."""
+        with self._lock:
+            self._trial_started = None
+
+    def probe_due(self) -> bool:
+        with self._lock:
+            if self.state == BreakerState.CLOSED:
+                return False
+            return time.time() - self.opened_at >= self._open_for
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.last_status = ProviderStatus.AVAILABLE
+            self.last_error = None
+            self.last_outcome_at = time.time()
+            self._trial_started = None
+            if self.state != BreakerState.CLOSED:
+                self._set_state(BreakerState.CLOSED)
+
+    def record_failure(self, status: ProviderStatus, error: str = None):
+        with self._lock:
+            self.failures += 1
+            self.last_status = status
+            self.last_error = error
+            self.last_outcome_at = time.time()
+            self._trial_started = None
+            if (self.state == BreakerState.HALF_OPEN
+                    or self.failures >= settings.breaker_failure_threshold):
+                self._open(status)
+
+    def _open(self, status):
+        self.opened_at = time.time()
+        self._open_for = (settings.breaker_rate_limit_cooldown
+                          if status == ProviderStatus.RATE_LIMITED
+                          else settings.breaker_cooldown)
+        self._set_state(BreakerState.OPEN)
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning(f"{self.name}: цепь {self.state.value} → {state.value}"
+                           f"{f' ({self.last_error})' if self.last_error else ''}")
+        self.state = state
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state.value,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "last_outcome_at": self.last_outcome_at,
+                "opened_at": self.opened_at,
+            }
+
+
+class HealthMonitor:
+    """
+    Фоновая проверка провайдеров. Пингует только тех, у кого открыта цепь и истекла пауза,
+    либо тех, по кому давно не было ни одного реального запроса.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            for p in self.manager.providers:
+                if self._needs_probe(p):
+                    await self._probe(p)
+            await asyncio.sleep(settings.health_probe_interval)
+
+    @staticmethod
+    def _needs_probe(p) -> bool:
+        if p.health.probe_due():
+            return True
+        last = p.health.last_outcome_at
+        return last is None or time.time() - last >= settings.health_idle_probe_interval
+
+    @staticmethod
+    async def _probe(p):
+        try:
+            status = await asyncio.to_thread(p.probe)
+        except Exception as e:
+            logger.error(f"{p.name}: проверка не удалась: {e}")
+            status = ProviderStatus.UNAVAILABLE
+        if status == ProviderStatus.NO_API_KEY:
+            return
+        if status == ProviderStatus.AVAILABLE:
+            p.health.record_success()
+        else:
+            p.health.record_failure(status, f"probe: {status.value}")
@@ -0,0 +1,41 @@
+import logging
+from importlib.util import find_spec
+
+import httpx
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = find_spec("h2") is not None
+
+
+def _client_kwargs(headers, http2: bool, timeout) -> dict:
+    use_http2 = http2 and HTTP2_AVAILABLE
+    if http2 and not HTTP2_AVAILABLE:
+        logger.info("h2 не установлен, используется HTTP/1.1")
+    return dict(
+        headers=headers,
+        http2=use_http2,
+        timeout=settings.api_request_timeout if timeout is None else timeout,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+    )
+
+
+def create_http_client(headers=None, http2: bool = True, timeout: float = None) -> httpx.Client:
+    """
+    Долгоживущий клиент с пулом keep-alive соединений.
+    Каждый провайдер ходит на один хост, поэтому лимиты пула — это лимиты на хост.
+    HTTP/2 включается, только если установлен пакет h2.
+    """
+    return httpx.Client(**_client_kwargs(headers, http2, timeout))
+
+
+def create_async_http_client(headers=None, http2: bool = True,
+                             timeout: float = None) -> httpx.AsyncClient:
+    """То же для asyncio: пул привязан к event loop, в котором клиент впервые используется."""
+    return httpx.AsyncClient(**_client_kwargs(headers, http2, timeout))
@@ -0,0 +1,175 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from agent.providers.base_provider import REFRESH_AHEAD
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+_METHOD_TTL = {
+    "get_current_prices": lambda: settings.cache_ttl_prices,
+    "get_historical_prices": lambda: settings.cache_ttl_historical,
+    "get_top_coins": lambda: settings.cache_ttl_top,
+}
+
+
+def _entry_key(method_name, strategy, preferred_provider, kwargs) -> tuple:
+    """
+    Запись кэша, которую обновляет вызов. Все limit до надмножества делят один список топа
+    на валюту, все окна days монеты — один ряд на интервал, поэтому обновлять их нужно один раз.
+    """
+    if method_name == "get_top_coins":
+        params = (kwargs.get("vs_currency", "usd"),
+                  max(kwargs.get("limit", 10), settings.top_coins_superset))
+    elif method_name == "get_historical_prices":
+        params = (kwargs.get("coin_id"), kwargs.get("vs_currency", "usd"),
+                  "daily" if kwargs.get("days", 7) > 1 else "hourly")
+    else:
+        params = tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                              for k, v in kwargs.items()))
+    return method_name, strategy, preferred_provider, params
+
+
+class _HotKey:
+    __slots__ = ("method_name", "strategy", "preferred_provider", "kwargs", "entry",
+                 "score", "seen_at")
+
+    def __init__(self, method_name, strategy, preferred_provider, kwargs):
+        self.method_name = method_name
+        self.strategy = strategy
+        self.preferred_provider = preferred_provider
+        self.kwargs = kwargs
+        self.entry = _entry_key(method_name, strategy, preferred_provider, kwargs)
+        self.score = 0.0
+        self.seen_at = time.time()
+
+    @property
+    def span(self) -> int:
+        # Самое длинное окно или самый длинный топ записи покрывает все остальные
+        return self.kwargs.get("days") or self.kwargs.get("limit") or 0
+
+    def decayed(self, now) -> float:
+        return self.score * 0.5 ** ((now - self.seen_at) / settings.prefetch_half_life)
+
+
+class PrefetchScheduler:
+    """
+    Прогрев популярных ключей. Частота запросов по каждому (метод, параметры) считается
+    с экспоненциальным затуханием; ключи, делящие одну запись кэша, складываются, и top-K
+    записей обновляются одним запросом с самым широким из их параметров незадолго
+    до истечения TTL, но не чаще prefetch_budget_per_minute запросов в апстрим в минуту.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._lock = threading.Lock()
+        self._keys: Dict[tuple, _HotKey] = {}
+        self._fetched: Dict[tuple, float] = {}
+        self._spent = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"refreshed": 0, "failed": 0, "skipped_budget": 0}
+        manager.add_listener(self.record)
+
+    def record(self, method_name, strategy, preferred_provider, kwargs, resp):
+        if method_name not in _METHOD_TTL:
+            return
+        key = (method_name, strategy, preferred_provider,
+               tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in kwargs.items())))
+        now = time.time()
+        with self._lock:
+            hot = self._keys.get(key)
+            if hot is None:
+                if len(self._keys) >= settings.prefetch_max_tracked:
+                    self._prune(now)
+                hot = self._keys[key] = _HotKey(method_name, strategy, preferred_provider, dict(kwargs))
+            hot.score = hot.decayed(now) + 1
+            hot.seen_at = now
+            if resp.success and not resp.cached:
+                self._fetched[hot.entry] = now
+
+    def _prune(self, now):
+        ranked = sorted(self._keys.items(), key=lambda kv: kv[1].decayed(now))
+        for key, _ in ranked[:max(1, len(ranked) // 4)]:
+            del self._keys[key]
+        live = {h.entry for h in self._keys.values()}
+        self._fetched = {e: t for e, t in self._fetched.items() if e in live}
+
+    def _due(self, now):
+        with self._lock:
+            scores: Dict[tuple, float] = {}
+            widest: Dict[tuple, _HotKey] = {}
+            for h in self._keys.values():
+                scores[h.entry] = scores.get(h.entry, 0.0) + h.decayed(now)
+                if h.entry not in widest or h.span > widest[h.entry].span:
+                    widest[h.entry] = h
+            hot = [e for e, score in scores.items() if score >= settings.prefetch_min_score]
+            hot.sort(key=scores.get, reverse=True)
+            due = []
+            for entry in hot[:settings.prefetch_top_k]:
+                h, fetched_at = widest[entry], self._fetched.get(entry)
+                ttl = _METHOD_TTL[h.method_name]()
+                if fetched_at is None or now - fetched_at >= ttl - settings.prefetch_lead:
+                    due.append(h)
+            return due
+
+    def _take_budget(self, now) -> bool:
+        while self._spent and now - self._spent[0] >= 60:
+            self._spent.popleft()
+        if len(self._spent) >= settings.prefetch_budget_per_minute:
+            return False
+        self._spent.append(now)
+        return True
+
+    def _refresh(self, hot: _HotKey):
+        token = REFRESH_AHEAD.set(True)
+        try:
+            return self.manager.dispatch(hot.method_name, hot.strategy,
+                                         hot.preferred_provider, **hot.kwargs)
+        finally:
+            REFRESH_AHEAD.reset(token)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.prefetch_interval)
+            now = time.time()
+            for hot in self._due(now):
+                if not self._take_budget(now):
+                    self._stats["skipped_budget"] += 1
+                    break
+                try:
+                    resp = await asyncio.to_thread(self._refresh, hot)
+                except Exception as e:
+                    resp = None
+                    logger.warning(f"Prefetch {hot.method_name}{hot.kwargs}: {e}")
+                if resp is not None and resp.success:
+                    with self._lock:
+                        self._fetched[hot.entry] = time.time()
+                    self._stats["refreshed"] += 1
+                else:
+                    self._stats["failed"] += 1
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            top = sorted(self._keys.values(), key=lambda h: h.decayed(now), reverse=True)
+            return {**self._stats, "tracked": len(self._keys),
+                    "hot": [{"method": h.method_name, "params": h.kwargs,
+                             "score": round(h.decayed(now), 2)}
+                            for h in top[:settings.prefetch_top_k]]}
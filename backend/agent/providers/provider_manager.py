@@ -1,12 +1,16 @@
+import asyncio
 import logging
+import threading
 from typing import List, Optional
 
 from agent.providers.base_provider import (
     CryptoDataProvider, ProviderResponse, ProviderStatus,
-    DataCapability, FetchStrategy,
+    DataCapability, FetchStrategy, REFRESH_AHEAD,
 )
 from agent.providers.coingecko_provider import CoinGeckoProvider
 from agent.providers.coinmarketcap_provider import CoinMarketCapProvider
+from agent.providers.singleflight import upstream_flight
+from settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +20,28 @@ class ProviderManager:
         self.providers = providers or [CoinGeckoProvider(), CoinMarketCapProvider()]
         self.providers.sort(key=lambda p: p.priority)
         self._by_name = {p.name: p for p in self.providers}
+        # Ограничение одновременных обращений к каждому провайдеру при параллельном fan-out
+        self._slots = {p.name: threading.BoundedSemaphore(settings.provider_max_concurrency)
+                       for p in self.providers}
+        self._listeners = []
         logger.info(f"ProviderManager: {[p.name for p in self.providers]}")
 
+    def add_listener(self, listener):
+        """listener(method_name, strategy, preferred_provider, kwargs, resp) — после каждого запроса."""
+        self._listeners.append(listener)
+
     def dispatch(self, method_name, strategy, preferred_provider=None, **kwargs):
         logger.info(f"Диспетчер: {method_name}, стратегия={strategy.value}")
+        resp = self._route(method_name, strategy, preferred_provider, **kwargs)
+        if not REFRESH_AHEAD.get():
+            for listener in self._listeners:
+                try:
+                    listener(method_name, strategy, preferred_provider, kwargs, resp)
+                except Exception as e:
+                    logger.warning(f"Ошибка слушателя диспетчера: {e}")
+        return resp
 
+    def _route(self, method_name, strategy, preferred_provider=None, **kwargs):
         if strategy == FetchStrategy.SPECIFIC:
             return self._specific(method_name, preferred_provider, **kwargs)
         if strategy == FetchStrategy.MERGE:
@@ -30,16 +51,22 @@ class ProviderManager:
             return self._fallback(method_name, required_cap=cap, **kwargs)
         return self._fallback(method_name, **kwargs)
 
+    async def adispatch(self, method_name, strategy, preferred_provider=None, **kwargs):
+        key = ("dispatch", method_name, strategy, preferred_provider,
+               tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                            for k, v in kwargs.items())))
+        return await upstream_flight.ado(key, lambda: asyncio.to_thread(
+            self.dispatch, method_name, strategy, preferred_provider, **kwargs))
+
     def _fallback(self, method_name, required_cap=None, **kwargs):
         last_error = None
         for p in self.providers:
             if required_cap and required_cap not in p.get_capabilities():
                 continue
-            status = p.get_status()
-            if status in (ProviderStatus.UNAVAILABLE, ProviderStatus.NO_API_KEY):
+            if not self._available(p):
                 continue
             try:
-                resp = getattr(p, method_name)(**kwargs)
+                resp = self._call(p, method_name, **kwargs)
                 if resp.success:
                     logger.info(f"Fallback: {p.name} ✓")
                     return resp
@@ -53,25 +80,29 @@ class ProviderManager:
         if not p:
             return ProviderResponse(False, provider_name or "unknown",
                                     error=f"Провайдер '{provider_name}' не найден")
+        if not self._available(p):
+            return ProviderResponse(False, provider_name,
+                                    error=f"Провайдер '{provider_name}' временно недоступен "
+                                          f"({p.get_status().value})")
         try:
-            return getattr(p, method_name)(**kwargs)
+            return self._call(p, method_name, **kwargs)
         except Exception as e:
             return ProviderResponse(False, provider_name, error=str(e))
 
     def _merge(self, method_name, **kwargs):
         merged, sources = {}, []
         for p in self.providers:
-            status = p.get_status()
-            if status in (ProviderStatus.UNAVAILABLE, ProviderStatus.NO_API_KEY):
+            if not self._available(p):
                 continue
             try:
-                resp = getattr(p, method_name)(**kwargs)
+                resp = self._call(p, method_name, **kwargs)
                 if not resp.success: continue
                 sources.append(p.name)
                 if isinstance(resp.data, dict):
                     for cid, cd in resp.data.items():
                         if cid not in merged:
-                            merged[cid] = cd
+                            # Данные провайдера — снимок из кэша; дополняем свою копию
+                            merged[cid] = dict(cd) if isinstance(cd, dict) else cd
                         elif isinstance(cd, dict):
                             for f, v in cd.items():
                                 if v is not None and merged[cid].get(f) is None:
@@ -82,13 +113,31 @@ class ProviderManager:
             return ProviderResponse(False, "none", error="Нет данных")
         return ProviderResponse(True, "+".join(sources), merged)
 
+    def _call(self, p, method_name, **kwargs):
+        with self._slots[p.name]:
+            return getattr(p, method_name)(**kwargs)
+
+    @staticmethod
+    def _available(p):
+        # Цепь провайдера здесь не проверяется: кэш и локальные ряды отдаются и при
+        # разомкнутой цепи, а сам провайдер не пойдёт в апстрим (см. _request)
+        return p.get_status() != ProviderStatus.NO_API_KEY
+
     @staticmethod
     def _method_to_cap(method_name):
         return {"get_current_prices": DataCapability.CURRENT_PRICE,
                 "get_historical_prices": DataCapability.HISTORICAL,
                 "get_top_coins": DataCapability.TOP_COINS}.get(method_name)
 
+    def close(self):
+        for p in self.providers:
+            try:
+                p.close()
+            except Exception as e:
+                logger.warning(f"{p.name}: ошибка при закрытии: {e}")
+
     def get_all_statuses(self):
         return {p.name: {"status": p.get_status().value, "priority": p.priority,
-                         "capabilities": [c.value for c in p.get_capabilities()]}
+                         "capabilities": [c.value for c in p.get_capabilities()],
+                         "breaker": p.health.snapshot()}
                 for p in self.providers}
\ No newline at end of file
@@ -0,0 +1,85 @@
+import time
+from typing import Optional
+
+from agent.contracts.series import PriceSeries
+from cache import market_cache, MISS
+from settings import settings
+
+DAY_MS = 86_400_000
+STEP_MS = {"daily": DAY_MS, "hourly": 3_600_000}
+
+
+class PriceHistory:
+    """
+    Локальный ряд цен одной монеты в одной валюте и с одним шагом.
+    Хранит самое длинное запрошенное окно; последний отсчёт — «живая» цена на момент загрузки.
+    Объекты не изменяются: колонки PriceSeries только для чтения, дозагрузка хвоста создаёт новый ряд.
+    """
+    __slots__ = ("series", "days", "step_ms", "fetched_at")
+
+    def __init__(self, series: PriceSeries, days: int, step_ms: int,
+                 fetched_at: Optional[float] = None):
+        self.series = series
+        self.days = days
+        self.step_ms = step_ms
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+    @classmethod
+    def from_raw(cls, raw_prices, days: int, step_ms: int) -> "PriceHistory":
+        return cls(PriceSeries.from_pairs(raw_prices), days, step_ms)
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return self.series.last_ts
+
+    def covers(self, days: int) -> bool:
+        return self.days >= days
+
+    def is_fresh(self) -> bool:
+        return time.time() - self.fetched_at < settings.cache_ttl_historical
+
+    def is_servable_stale(self) -> bool:
+        grace = settings.cache_stale_grace.get("historical", 0)
+        return time.time() - self.fetched_at < settings.cache_ttl_historical + grace
+
+    def with_tail(self, raw_tail) -> "PriceHistory":
+        # Прежний последний отсчёт был промежуточной ценой — его заменяет свежий хвост.
+        # Хвост прореживается до шага ряда, самый свежий отсчёт сохраняется всегда.
+        base = self.series[:-1]
+        tail = PriceSeries.from_pairs(raw_tail)
+        if base.last_ts is not None:
+            tail = tail.since(base.last_ts + 1)
+        if not len(tail):
+            return PriceHistory(self.series, self.days, self.step_ms)
+
+        keep, last = [], base.last_ts
+        for i, ts in enumerate(tail.timestamps[:-1].tolist()):
+            if last is None or ts - last >= self.step_ms:
+                keep.append(i)
+                last = ts
+        keep.append(len(tail) - 1)
+        series = base.concat(PriceSeries(tail.timestamps[keep], tail.prices[keep]))
+
+        cutoff = series.last_ts - self.days * DAY_MS - self.step_ms
+        return PriceHistory(series.since(cutoff), self.days, self.step_ms)
+
+    def slice(self, days: int) -> PriceSeries:
+        if not len(self.series):
+            return self.series
+        return self.series.since(self.last_ts - days * DAY_MS)
+
+
+class SeriesStore:
+    """Ряды живут в общем кэше в отдельном пространстве имён с длинным TTL и общим LRU-бюджетом."""
+
+    NAMESPACE = "series"
+
+    def get(self, key) -> Optional[PriceHistory]:
+        series = market_cache.get(self.NAMESPACE, key)
+        return None if series is MISS else series
+
+    def put(self, key, series: PriceHistory):
+        market_cache.set(self.NAMESPACE, key, series)
+
+
+series_store = SeriesStore()
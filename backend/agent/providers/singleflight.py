@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Склейка одинаковых одновременных запросов: первый вызов с ключом выполняет работу,
+    остальные ждут его и получают тот же результат (или то же исключение).
+    do() — для потоков, ado() — для корутин одного event loop,
+    spawn() — фоновое выполнение в пуле потоков, если такой ключ ещё не в работе.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {"executed": 0, "coalesced": 0, "background": 0}
+        self._executor = None
+        self._pending = set()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def ado(self, key: Hashable, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(coro_fn())
+                self._tasks[key] = task
+                task.add_done_callback(lambda t: self._forget(key, t))
+                self._stats["executed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        # shield: отмена одного ожидающего не отменяет общий запрос для остальных
+        return await asyncio.shield(task)
+
+    def spawn(self, key: Hashable, fn: Callable[[], Any]) -> bool:
+        with self._lock:
+            if key in self._calls or key in self._pending:
+                return False
+            self._pending.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=settings.background_refresh_workers,
+                                                    thread_name_prefix="refresh")
+            self._stats["background"] += 1
+        self._executor.submit(self._run_background, key, fn)
+        return True
+
+    def _run_background(self, key, fn):
+        try:
+            self.do(key, fn)
+        except Exception as e:
+            logger.warning(f"Фоновое обновление {key} не удалось: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def _forget(self, key, task):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # помечаем исключение полученным, даже если ждать было некому
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls) + len(self._tasks)}
+
+
+upstream_flight = SingleFlight()
@@ -0,0 +1,150 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from agent.coin_registry import COMMON_WORDS, coin_registry
+from agent.contracts import VALID_COINS, COIN_ALIASES, PERIOD_KEYWORDS
+from settings import settings
+
+# Падежные окончания после русской основы: "биткоин" → биткоина, биткоином; "солана" → солану.
+# Список закрытый, чтобы "день" не находился в "деньги"
+RU_SUFFIX = r"(?:ами|ями|ом|ем|ой|ей|ов|ев|ам|ям|ах|ях|а|я|у|ю|ы|и|е)?"
+EN_SUFFIX = r"(?:'?s)?"
+_CYRILLIC = re.compile(r"[а-яё]")
+
+# "14 дней", "2 недели", "3 months", "1 год": единица переводится в дни
+_UNITS = (
+    (re.compile(r"ч|час[а-яё]*|h|hours?"), 1 / 24),
+    (re.compile(r"дн[а-яё]*|день|сут[а-яё]*|days?|d"), 1),
+    (re.compile(r"недел[а-яё]*|weeks?|w"), 7),
+    (re.compile(r"мес|месяц[а-яё]*|months?"), 30),
+    (re.compile(r"год[а-яё]*|лет|years?|y"), 365),
+)
+_NUM_PERIOD = (r"(?P<num>\d{1,3})\s*(?P<unit>"
+               + "|".join(p.pattern for p, _ in _UNITS) + ")")
+
+
+def _to_days(num: str, unit: str) -> int:
+    unit = unit.lower()
+    factor = next(f for p, f in _UNITS if p.fullmatch(unit))
+    return math.ceil(int(num) * factor)
+
+
+def _stem(term: str) -> str:
+    # Окончание именительного падежа отбрасываем, дальше его заменяет RU_SUFFIX
+    return term[:-1] if len(term) > 4 and term[-1] in "ая" else term
+
+
+def _alternation(terms) -> str:
+    # Длинные варианты раньше коротких: "bitcoin-cash" побеждает "bitcoin", "эфириум" — "эфир"
+    return "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+
+
+@dataclass
+class QueryMatch:
+    coins: List[str] = field(default_factory=list)
+    period_days: Optional[int] = None
+    # (начало, конец, "coin" | "period", значение)
+    spans: List[Tuple[int, int, str, object]] = field(default_factory=list)
+
+
+class QueryMatcher:
+    """
+    Один скомпилированный regex на все монеты и периоды: запрос проходится один раз,
+    совпадения только по границам слов, при пересечении побеждает самое длинное.
+    Названия ищутся без учёта регистра, тикеры реестра — только заглавными или с $.
+    Строится один раз; при обновлении реестра монет создаётся новый экземпляр (get_matcher).
+    """
+
+    def __init__(self, coin_terms: Dict[str, str], period_terms: Dict[str, int],
+                 tickers: Optional[Dict[str, str]] = None):
+        ru, en = {}, {}
+        for term, coin_id in coin_terms.items():
+            term = term.lower()
+            if _CYRILLIC.search(term):
+                ru[_stem(term)] = coin_id
+            else:
+                en[term] = coin_id
+                if "-" in term:
+                    en[term.replace("-", " ")] = coin_id
+        self._coins = {**ru, **en}
+        self._tickers = {t.upper(): coin_id for t, coin_id in (tickers or {}).items()}
+        bare = [t for t in self._tickers if t.lower() not in COMMON_WORDS]
+        self._periods = {t.lower(): d for t, d in period_terms.items()}
+        period_ru = [t for t in self._periods if _CYRILLIC.search(t)]
+        period_en = [t for t in self._periods if not _CYRILLIC.search(t)]
+
+        parts = [_NUM_PERIOD]
+        if period_ru:
+            parts.append(rf"(?P<period_ru>{_alternation(period_ru)}){RU_SUFFIX}")
+        if period_en:
+            parts.append(rf"(?P<period_en>{_alternation(period_en)}){EN_SUFFIX}")
+        if ru:
+            parts.append(rf"(?P<coin_ru>{_alternation(ru)}){RU_SUFFIX}")
+        if en:
+            parts.append(rf"(?P<coin_en>{_alternation(en)}){EN_SUFFIX}")
+        if self._tickers:
+            parts.append(rf"\$(?P<ticker_dollar>{_alternation(self._tickers)})")
+        if bare:
+            parts.append(rf"(?-i:(?P<ticker>{_alternation(bare)}))")
+        self._pattern = re.compile(rf"(?<!\w)(?:{'|'.join(parts)})(?!\w)", re.IGNORECASE)
+
+    def match(self, query: str) -> QueryMatch:
+        result = QueryMatch()
+        seen = set()
+        numeric = keyword = None
+        for m in self._pattern.finditer(query):
+            kind = m.lastgroup
+            if m.group("num"):
+                days = _to_days(m.group("num"), m.group("unit"))
+                if not 0 < days <= 365:
+                    continue
+                numeric = numeric or days
+                result.spans.append((m.start(), m.end(), "period", days))
+            elif kind.startswith("period"):
+                days = self._periods[m.group(kind).lower()]
+                keyword = keyword or days
+                result.spans.append((m.start(), m.end(), "period", days))
+            else:
+                term = m.group(kind)
+                coin_id = (self._tickers[term.upper()] if kind.startswith("ticker")
+                           else self._coins[term.lower()])
+                result.spans.append((m.start(), m.end(), "coin", coin_id))
+                if coin_id not in seen:
+                    seen.add(coin_id)
+                    result.coins.append(coin_id)
+        # Явное число дней точнее слова; из нескольких слов берётся первое по тексту
+        result.period_days = numeric or keyword
+        return result
+
+
+def build_matcher(extra_coins: Optional[Dict[str, str]] = None,
+                  tickers: Optional[Dict[str, str]] = None) -> QueryMatcher:
+    terms = dict(extra_coins or {})
+    terms.update({coin: coin for coin in VALID_COINS})
+    terms.update(COIN_ALIASES)
+    return QueryMatcher(terms, PERIOD_KEYWORDS, tickers)
+
+
+_current = (None, None)
+
+
+def get_matcher() -> QueryMatcher:
+    """Матчер по текущей версии реестра монет; пересобирается после его обновления."""
+    global _current
+    version, matcher = _current
+    if version != coin_registry.version:
+        version = coin_registry.version
+        max_rank = settings.coin_matcher_max_rank
+        matcher = build_matcher(coin_registry.aliases(max_rank), coin_registry.tickers(max_rank))
+        _current = (version, matcher)
+    return matcher
+
+
+def match_coins(query: str) -> List[str]:
+    return get_matcher().match(query).coins
+
+
+def match_period(query: str) -> Optional[int]:
+    return get_matcher().match(query).period_days
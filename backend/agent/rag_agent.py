@@ -11,14 +11,38 @@ class RAGReasonerAgent(BaseAgent):
     def __init__(self):
         super().__init__("reasoner")
 
-    def execute(self, user_query: str, context: FormattedContext) -> str:
-        logger.info(f"[RAG] контекст: {context.total_chars} символов, усечён={context.was_truncated}")
+    async def execute(self, user_query: str, context: FormattedContext) -> str:
+        prompt = self._build_prompt(user_query, context)
+        try:
+            response = await self._call_llm(prompt, temperature=0.3)
+            logger.info(f"[RAG] Ответ: {len(response)} символов")
+            return response
+        except Exception as e:
+            logger.error(f"[RAG] Ошибка: {e}")
+            return f"Ошибка генерации ответа: {e}"
+
+    async def astream(self, user_query: str, context: FormattedContext):
+        prompt = self._build_prompt(user_query, context)
+        total = 0
+        try:
+            async for chunk in self._stream_llm(prompt, temperature=0.3):
+                total += len(chunk)
+                yield chunk
+            logger.info(f"[RAG] Ответ (поток): {total} символов")
+        except Exception as e:
+            logger.error(f"[RAG] Ошибка: {e}")
+            yield f"Ошибка генерации ответа: {e}"
+
+    @staticmethod
+    def _build_prompt(user_query: str, context: FormattedContext) -> str:
+        logger.info(f"[RAG] контекст: ~{context.total_tokens} токенов, {context.total_chars} символов, "
+                    f"усечён={context.was_truncated}")
 
         quality_note = ""
         if context.was_truncated:
             quality_note = "\n⚠️ Контекст был сокращён. Некоторые детали могут отсутствовать.\n"
 
-        prompt = (
+        return (
             "Ты — эксперт по криптовалютам.\n\n"
             "ПРАВИЛА:\n"
             "1. Используй ТОЛЬКО предоставленные данные\n"
@@ -29,12 +53,4 @@ class RAGReasonerAgent(BaseAgent):
             f"{quality_note}\n"
             f"ДАННЫЕ:\n{context.context_str}\n\n"
             f"ВОПРОС: {user_query}\n\nОТВЕТ:"
-        )
-
-        try:
-            response = self._call_llm(prompt, temperature=0.3)
-            logger.info(f"[RAG] Ответ: {len(response)} символов")
-            return response
-        except Exception as e:
-            logger.error(f"[RAG] Ошибка: {e}")
-            return f"Ошибка генерации ответа: {e}"
\ No newline at end of file
+        )
\ No newline at end of file
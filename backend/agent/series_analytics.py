@@ -0,0 +1,121 @@
+import logging
+from itertools import combinations
+from typing import Dict, Optional
+
+import numpy as np
+
+from agent.contracts import FetchedData, PriceSeries
+from agent.providers.series_store import DAY_MS
+from cache import market_cache, MISS
+
+logger = logging.getLogger(__name__)
+
+# Окна SMA/EMA в днях; в точках ряда — по его шагу, чтобы у часового и дневного ряда они совпадали
+SHORT_WINDOW_DAYS = 7
+LONG_WINDOW_DAYS = 30
+
+
+def _ema(prices: np.ndarray, window: int) -> float:
+    alpha = 2.0 / (window + 1)
+    # Веса alpha * (1 - alpha)^k считаются вектором, без цикла по точкам
+    weights = alpha * (1 - alpha) ** np.arange(len(prices))[::-1]
+    weights[0] /= alpha  # первый отсчёт — начальное значение EMA
+    return float(weights @ prices)
+
+
+def series_stats(series: PriceSeries) -> Optional[dict]:
+    ts, p = series.timestamps, series.prices
+    if len(p) < 2 or np.any(p <= 0):
+        return None
+    log_ret = np.diff(np.log(p))
+    step_ms = float(np.median(np.diff(ts)))
+    periods_per_year = 365 * DAY_MS / step_ms if step_ms > 0 else 0.0
+
+    hi, lo = int(p.argmax()), int(p.argmin())
+    running_max = np.maximum.accumulate(p)
+    drawdown = p / running_max - 1
+    trough = int(drawdown.argmin())
+    peak = int(p[:trough + 1].argmax())
+
+    stats = {
+        "points": len(p),
+        "first": float(p[0]), "last": float(p[-1]),
+        "change_percent": round(float((p[-1] / p[0] - 1) * 100), 2),
+        "high": float(p[hi]), "high_at": int(ts[hi]),
+        "low": float(p[lo]), "low_at": int(ts[lo]),
+        "max_drawdown_percent": round(float(drawdown[trough] * 100), 2),
+        "drawdown_peak_at": int(ts[peak]), "drawdown_trough_at": int(ts[trough]),
+        "volatility_percent": round(float(log_ret.std(ddof=1) * 100), 2) if len(log_ret) > 1 else None,
+        "volatility_annual_percent": (round(float(log_ret.std(ddof=1) * np.sqrt(periods_per_year) * 100), 2)
+                                      if len(log_ret) > 1 else None),
+        "best_return_percent": round(float(np.expm1(log_ret.max()) * 100), 2),
+        "worst_return_percent": round(float(np.expm1(log_ret.min()) * 100), 2),
+    }
+    for days in (SHORT_WINDOW_DAYS, LONG_WINDOW_DAYS):
+        window = round(days * DAY_MS / step_ms) if step_ms > 0 else 0
+        if 2 <= window <= len(p):
+            stats[f"sma_{days}d"] = round(float(p[-window:].mean()), 6)
+            stats[f"ema_{days}d"] = round(_ema(p, window), 6)
+    return stats
+
+
+def correlation(a: PriceSeries, b: PriceSeries) -> Optional[float]:
+    """Корреляция лог-доходностей по общим отметкам времени."""
+    common, ia, ib = np.intersect1d(a.timestamps, b.timestamps, assume_unique=True,
+                                    return_indices=True)
+    if len(common) < 4:
+        return None
+    ra, rb = np.diff(np.log(a.prices[ia])), np.diff(np.log(b.prices[ib]))
+    if ra.std() == 0 or rb.std() == 0:
+        return None
+    return round(float(np.corrcoef(ra, rb)[0, 1]), 3)
+
+
+class SeriesAnalyzer:
+    """
+    Этап между fetcher и formatter: по историческим рядам считает доходности, волатильность,
+    максимальную просадку, SMA/EMA, экстремумы с датами и корреляцию между монетами,
+    чтобы reasoner получал готовые числа, а не сотни точек.
+
+    Ряды неизменяемы, поэтому результат кэшируется по версии ряда: монета, границы и длина
+    среза, последняя цена.
+    """
+
+    NAMESPACE = "analytics"
+
+    def analyze(self, fetched_data: FetchedData) -> Dict[str, dict]:
+        series: Dict[str, PriceSeries] = {}
+        for entry in fetched_data.entries:
+            if not isinstance(entry.data, dict):
+                continue
+            for cid, cd in entry.data.items():
+                if isinstance(cd, dict) and isinstance(cd.get("prices"), PriceSeries):
+                    series[cid] = cd["prices"]
+        if not series:
+            return {}
+
+        result = {"series": {}, "correlation": {}}
+        for cid, s in series.items():
+            try:
+                stats = self._cached_stats(cid, s)
+            except Exception as e:
+                logger.warning(f"[Analytics] {cid}: {e}")
+                continue
+            if stats is not None:
+                result["series"][cid] = stats
+        for (ca, a), (cb, b) in combinations(series.items(), 2):
+            corr = correlation(a, b)
+            if corr is not None:
+                result["correlation"][f"{ca}/{cb}"] = corr
+
+        logger.info(f"[Analytics] рядов: {len(result['series'])}, пар: {len(result['correlation'])}")
+        return result
+
+    def _cached_stats(self, coin_id: str, s: PriceSeries) -> Optional[dict]:
+        if len(s) < 2:
+            return None
+        key = (coin_id, int(s.timestamps[0]), int(s.timestamps[-1]), len(s), float(s.prices[-1]))
+        stats = market_cache.get(self.NAMESPACE, key)
+        if stats is MISS:
+            stats = market_cache.set(self.NAMESPACE, key, series_stats(s))
+        return stats
@@ -5,8 +5,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from agent import ControllerAgent
+from agent.coin_registry import CoinRegistryUpdater, coin_registry
 from agent.providers import ProviderManager
+from agent.providers.health import HealthMonitor
+from agent.providers.prefetch import PrefetchScheduler
 from api.routes import ask, market, suggest, system
+from llm import EragAPI
 from settings import settings
 
 logging.basicConfig(level=logging.INFO,
@@ -14,17 +18,29 @@ logging.basicConfig(level=logging.INFO,
 
 controller = None
 provider = None
+prefetch = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global controller, provider
+    global controller, provider, prefetch
     logging.info("Запуск...")
-    controller = ControllerAgent()
     provider = ProviderManager()
+    controller = ControllerAgent(provider)
+    monitor = HealthMonitor(provider)
+    monitor.start()
+    prefetch = PrefetchScheduler(provider)
+    prefetch.start()
+    registry_updater = CoinRegistryUpdater(coin_registry, provider)
+    registry_updater.start()
     logging.info("Готово ✓")
     yield
     logging.info("Остановка...")
+    await registry_updater.stop()
+    await prefetch.stop()
+    await monitor.stop()
+    provider.close()
+    await EragAPI.aclose()
 
 
 def create_app() -> FastAPI:
@@ -0,0 +1,55 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from agent.contracts import PriceSeries
+from settings import settings
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if ORJSON_AVAILABLE else 0
+
+
+def _default(obj):
+    if isinstance(obj, PriceSeries):
+        # Готовый JSON из колонок вставляется в ответ как есть; json без orjson так не умеет
+        return orjson.Fragment(obj.to_json()) if ORJSON_AVAILABLE else obj.to_points()
+    if isinstance(obj, (tuple, frozenset)):
+        return list(obj)
+    raise TypeError(f"Тип {type(obj).__name__} не сериализуется в JSON")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Ответ для уже проверенных данных: сериализуется orjson (без него — json) напрямую,
+    минуя повторную валидацию через response_model. Схема в OpenAPI остаётся от response_model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"),
+                          default=_default).encode("utf-8")
+
+
+def _plain(obj):
+    if isinstance(obj, PriceSeries):
+        return obj.to_points()
+    if isinstance(obj, dict):
+        return {k: _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v) for v in obj]
+    return obj
+
+
+def market_response(content: Any):
+    """Быстрый путь (fast_json_responses) или обычная валидация через response_model."""
+    if settings.fast_json_responses:
+        return FastJSONResponse(content)
+    return _plain(content)
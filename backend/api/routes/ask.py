@@ -1,8 +1,9 @@
 import logging
 import traceback
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from api.models.ask import AskRequest, AskResponse
-from api.services.analysis import get_analysis
+from api.services.analysis import _get_controller, get_analysis, stream_analysis
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -11,10 +12,21 @@ router = APIRouter()
 @router.post("", response_model=AskResponse)
 async def ask_question(request: AskRequest):
     try:
-        result = get_analysis(request.question)
+        result = await get_analysis(request.question)
         return AskResponse(answer=result["answer"],
                            total_time_ms=result.get("total_time_ms"),
                            trace=result.get("trace"))
     except Exception as e:
         logger.error(traceback.format_exc())
-        raise HTTPException(500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(500, detail=str(e))
+
+
+@router.post("/stream")
+async def ask_question_stream(request: AskRequest):
+    """SSE: события step (по одному на этап пайплайна), token и done."""
+    try:
+        _get_controller()
+    except RuntimeError as e:
+        raise HTTPException(503, detail=str(e))
+    return StreamingResponse(stream_analysis(request.question), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
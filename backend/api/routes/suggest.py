@@ -13,7 +13,7 @@ router = APIRouter()
 @router.post("", response_model=SuggestResponse)
 async def suggest_followups(request: SuggestRequest):
     try:
-        suggestions = get_followup_suggestions(request.past_questions)
+        suggestions = await get_followup_suggestions(request.past_questions)
         return SuggestResponse(suggestions=suggestions)
     except Exception as e:
         logger.error(traceback.format_exc())
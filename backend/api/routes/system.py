@@ -1,6 +1,9 @@
 from fastapi import APIRouter
 from api.models.system import HealthResponse
+from agent.coin_registry import coin_registry
+from agent.providers.singleflight import upstream_flight
 from api.services.market_data import get_provider_statuses
+from cache import market_cache, llm_cache, plan_cache
 from settings import settings
 
 router = APIRouter()
@@ -22,6 +25,19 @@ async def get_config():
         "cache_ttl": {"prices": settings.cache_ttl_prices,
                       "historical": settings.cache_ttl_historical,
                       "top": settings.cache_ttl_top},
+        "cache_stale_grace": settings.cache_stale_grace,
+        "cache_limits": {"max_entries": settings.cache_max_entries,
+                         "max_bytes": settings.cache_max_bytes},
         "api": {"timeout": settings.api_request_timeout,
                 "max_retries": settings.api_max_retries},
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/cache")
+async def cache_stats():
+    import api.app as app_module
+    prefetch = app_module.prefetch
+    return {"market": market_cache.stats(), "llm": llm_cache.stats(),
+            "plans": plan_cache.stats(), "coin_registry": coin_registry.stats(),
+            "singleflight": upstream_flight.stats(),
+            "prefetch": prefetch.stats() if prefetch else None}
@@ -1,8 +1,22 @@
+import json
+from typing import AsyncGenerator
+
 import api.app as app_module
 
 
-def get_analysis(question: str) -> dict:
+def _get_controller():
     controller = app_module.controller
     if controller is None:
         raise RuntimeError("Контроллер не инициализирован")
-    return controller.get_trace(question)
\ No newline at end of file
+    return controller
+
+
+async def get_analysis(question: str) -> dict:
+    return await _get_controller().aget_trace(question)
+
+
+async def stream_analysis(question: str) -> AsyncGenerator[str, None]:
+    """События пайплайна в формате Server-Sent Events."""
+    controller = _get_controller()
+    async for event, data in controller.astream_trace(question):
+        yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
@@ -1,5 +1,7 @@
+import asyncio
 from typing import List, Optional
 import api.app as app_module
+from agent.contracts import PriceSeries
 from agent.providers.base_provider import FetchStrategy
 
 
@@ -9,13 +11,13 @@ def _get_provider():
     return p
 
 
-def get_prices(coins: List[str], source: Optional[str] = None):
+async def get_prices(coins: List[str], source: Optional[str] = None):
     p = _get_provider()
     if source:
-        resp = p.dispatch("get_current_prices", FetchStrategy.SPECIFIC,
-                          preferred_provider=source, coin_ids=coins)
+        resp = await p.adispatch("get_current_prices", FetchStrategy.SPECIFIC,
+                                 preferred_provider=source, coin_ids=coins)
     else:
-        resp = p.dispatch("get_current_prices", FetchStrategy.FALLBACK, coin_ids=coins)
+        resp = await p.adispatch("get_current_prices", FetchStrategy.FALLBACK, coin_ids=coins)
     if not resp.success: return None
     result = {}
     for cid, data in resp.data.items():
@@ -27,26 +29,31 @@ def get_prices(coins: List[str], source: Optional[str] = None):
     return result
 
 
-def get_history(coin_id: str, days: int):
+async def get_history(coin_id: str, days: int, points: Optional[int] = None):
     p = _get_provider()
-    resp = p.dispatch("get_historical_prices", FetchStrategy.BEST_FOR,
-                      coin_id=coin_id, days=days)
+    resp = await p.adispatch("get_historical_prices", FetchStrategy.BEST_FOR,
+                             coin_id=coin_id, days=days)
     if not resp.success: return None
     d = resp.data
+    series = d.get("prices")
+    if not isinstance(series, PriceSeries):
+        series = PriceSeries([pt["timestamp"] for pt in series or []],
+                             [pt["price"] for pt in series or []])
+    if points:
+        series = series.downsample(points)
     return {"coin_id": d.get("coin_id", coin_id), "period_days": d.get("period_days", days),
-            "prices": [{"timestamp": pt["timestamp"], "price": pt["price"]}
-                       for pt in d.get("prices", [])],
+            "prices": series,
             "change_percent": d.get("change_percent"),
             "source": d.get("source", resp.source)}
 
 
-def get_top(limit: int, source: Optional[str] = None):
+async def get_top(limit: int, source: Optional[str] = None):
     p = _get_provider()
     if source:
-        resp = p.dispatch("get_top_coins", FetchStrategy.SPECIFIC,
-                          preferred_provider=source, limit=limit)
+        resp = await p.adispatch("get_top_coins", FetchStrategy.SPECIFIC,
+                                 preferred_provider=source, limit=limit)
     else:
-        resp = p.dispatch("get_top_coins", FetchStrategy.FALLBACK, limit=limit)
+        resp = await p.adispatch("get_top_coins", FetchStrategy.FALLBACK, limit=limit)
     if not resp.success: return None
     return [{"rank": c.get("rank", 0), "coin_id": c.get("coin_id", ""),
              "symbol": c.get("symbol", ""), "name": c.get("name", ""),
@@ -55,18 +62,19 @@ def get_top(limit: int, source: Optional[str] = None):
              "source": c.get("source", resp.source)} for c in resp.data]
 
 
-def get_comparison(coins: List[str], period_days: int):
+async def get_comparison(coins: List[str], period_days: int):
     p = _get_provider()
-    prices_resp = p.dispatch("get_current_prices", FetchStrategy.MERGE, coin_ids=coins)
+    prices_resp, *history = await asyncio.gather(
+        p.adispatch("get_current_prices", FetchStrategy.MERGE, coin_ids=coins),
+        *(p.adispatch("get_historical_prices", FetchStrategy.BEST_FOR,
+                      coin_id=cid, days=period_days) for cid in coins))
     comparison = {}
-    for cid in coins:
+    for cid, hr in zip(coins, history):
         cd = {"coin_id": cid}
         if prices_resp.success and cid in prices_resp.data:
             d = prices_resp.data[cid]
             cd.update({"price_usd": d.get("price_usd"), "market_cap_usd": d.get("market_cap_usd"),
                         "change_24h_percent": d.get("change_24h_percent")})
-        hr = p.dispatch("get_historical_prices", FetchStrategy.BEST_FOR,
-                        coin_id=cid, days=period_days)
         if hr.success:
             cd["change_period_percent"] = hr.data.get("change_percent")
         comparison[cid] = cd
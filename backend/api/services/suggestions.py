@@ -67,7 +67,7 @@ def _pad_suggestions(items: List[str]) -> List[str]:
     return result[:3]
 
 
-def get_followup_suggestions(past_questions: List[str]) -> List[str]:
+async def get_followup_suggestions(past_questions: List[str]) -> List[str]:
     cfg = settings.get_agent_config("planner")
     api = create_erag_api(cfg["api"], cfg["model"])
     block = "\n".join(f"- {q}" for q in past_questions[-15:])
@@ -80,7 +80,7 @@ def get_followup_suggestions(past_questions: List[str]) -> List[str]:
         {"role": "system", "content": _SYSTEM},
         {"role": "user", "content": user_msg},
     ]
-    raw = api.chat(messages, temperature=0.35, max_tokens=320)
+    raw = await api.achat(messages, temperature=0.35, max_tokens=320)
     try:
         parsed = _parse_suggestions(raw)
     except (json.JSONDecodeError, TypeError, ValueError) as e:
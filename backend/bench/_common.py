@@ -0,0 +1,32 @@
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 3) -> List[float]:
+    """Время каждого из repeat вызовов fn, миллисекунды."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+def report(title: str, rows: Dict[str, List[float]]):
+    print(f"\n{title}")
+    print(f"{'вариант':<28}{'median, мс':>12}{'p95, мс':>12}{'mean, мс':>12}")
+    for name, samples in rows.items():
+        s = summary(samples)
+        print(f"{name:<28}{s['median']:>12.3f}{s['p95']:>12.3f}{s['mean']:>12.3f}")
@@ -0,0 +1,55 @@
+"""
+Прореживание часового ряда за 365 дней (8760 точек): прежний шаг prices[::k] против LTTB
+(lttb_indices, PriceSeries.downsample) и полный путь форматтера для одного ряда.
+
+    python -m bench.downsample [--points 300] [--repeat 200]
+"""
+import argparse
+
+import numpy as np
+
+from agent.contracts import PriceSeries
+from agent.data_formatter import DataFormatter
+from agent.downsample import lttb_indices
+from bench._common import measure, report
+
+HOUR_MS = 3_600_000
+
+
+def hourly_year(seed: int = 0) -> PriceSeries:
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000_000 + np.arange(365 * 24, dtype=np.int64) * HOUR_MS
+    return PriceSeries(ts, 30_000 * np.exp(np.cumsum(rng.normal(0, 0.004, len(ts)))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--points", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    series = hourly_year()
+    points = [{"timestamp": t, "price": p} for t, p in series]
+    step = max(1, len(series) // args.points)
+    n = args.points
+
+    rows = {
+        "до: prices[::k] (list)": measure(lambda: points[::step], args.repeat),
+        "lttb_indices": measure(lambda: lttb_indices(series.timestamps, series.prices, n),
+                                args.repeat),
+        "PriceSeries.downsample": measure(lambda: series.downsample(n), args.repeat),
+        "форматтер: ряд в контекст": measure(
+            lambda: DataFormatter._series_values(series, n * 4, n), args.repeat),
+    }
+    report(f"{len(series)} → {n} точек, {args.repeat} повторов", rows)
+
+    # Что теряет шаг: насколько далеко от настоящих экстремумов уходят прореженные
+    stride = series.prices[::step]
+    lttb = series.downsample(n).prices
+    print(f"\nmax/min исходного ряда:  {series.prices.max():.2f} / {series.prices.min():.2f}")
+    print(f"max/min prices[::k]:     {stride.max():.2f} / {stride.min():.2f}")
+    print(f"max/min LTTB:            {lttb.max():.2f} / {lttb.min():.2f}")
+
+
+if __name__ == "__main__":
+    main()
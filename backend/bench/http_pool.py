@@ -0,0 +1,107 @@
+"""
+Задержка запросов к провайдеру: новое соединение на каждый запрос (как было с requests.get)
+против долгоживущего клиента с пулом keep-alive (create_http_client).
+
+Апстрим — локальный stub-сервер с ответом размером с /simple/price. С --tls сервер работает
+по HTTPS с самоподписанным сертификатом (нужен openssl), и в замер попадает TLS-рукопожатие.
+
+    python -m bench.http_pool [--requests 300] [--tls]
+"""
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from agent.providers.http_client import create_http_client
+from bench._common import measure, report
+
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+PAYLOAD = json.dumps({
+    cid: {"usd": 65000.5, "usd_market_cap": 1.28e12, "usd_24h_vol": 3.1e10, "usd_24h_change": -1.2}
+    for cid in ("bitcoin", "ethereum", "solana", "ripple", "cardano")
+}).encode()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, как у настоящего апстрима
+    # Заголовки и тело уходят разными write: без этого Nagle + delayed ACK дают +40 мс
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+def _self_signed(directory):
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                    "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+def start_stub(tls: bool, directory: str):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    if tls:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        cert, key = _self_signed(directory)
+        context.load_cert_chain(cert, key)
+        # Клиенты доверяют самоподписанному сертификату через стандартные переменные окружения
+        os.environ["SSL_CERT_FILE"] = os.environ["REQUESTS_CA_BUNDLE"] = cert
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scheme = "https" if tls else "http"
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/api/v3/simple/price"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--tls", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server, url = start_stub(args.tls, tmp)
+        params = {"ids": "bitcoin,ethereum", "vs_currencies": "usd"}
+        rows = {}
+        try:
+            # Прежний код провайдеров — requests.get; без requests — то же через httpx.get
+            if REQUESTS_AVAILABLE:
+                rows["до: requests.get"] = measure(
+                    lambda: requests.get(url, params=params).json(), args.requests)
+            else:
+                rows["до: httpx.get"] = measure(
+                    lambda: httpx.get(url, params=params).json(), args.requests)
+
+            pooled = create_http_client()
+            try:
+                rows["после: create_http_client"] = measure(
+                    lambda: pooled.get(url, params=params).json(), args.requests)
+            finally:
+                pooled.close()
+        finally:
+            server.shutdown()
+
+    report(f"{args.requests} запросов к локальному stub ({'HTTPS' if args.tls else 'HTTP'})", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Выбор функций планировщиком на размеченном наборе запросов: правила (IntentClassifier),
+роутер по эмбеддингам (EmbeddingIntentRouter) и LLM-планировщик (Groq, JSON-режим).
+
+Для каждого пути — точность (совпал набор функций), покрытие (путь дал ответ, а не передал
+запрос дальше) и задержка одного запроса. Роутер замеряется, если установлен
+sentence-transformers, LLM — если задан GROQ_API_KEY; кэш LLM-ответов на время замера отключён.
+
+    python -m bench.intent_router [--repeat 20] [--llm-repeat 1]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, List, Optional, Sequence
+
+from agent.contracts import AllowedFunction
+from agent.intent_classifier import IntentClassifier
+from agent.intent_router import EmbeddingIntentRouter
+from bench._common import summary
+from llm import EragAPI
+from settings import settings
+
+CURRENT = AllowedFunction.COINGECKO_CURRENT_PRICE.value
+HISTORICAL = AllowedFunction.COINGECKO_HISTORICAL.value
+TOP = AllowedFunction.COINGECKO_TOP_COINS.value
+
+# Запросы не совпадают с банком примеров роутера (EXAMPLE_QUERIES)
+LABELLED = [
+    ("сколько стоит биткоин", {CURRENT}),
+    ("цена эфира в долларах", {CURRENT}),
+    ("почём сейчас догикоин", {CURRENT}),
+    ("какой курс у солана", {CURRENT}),
+    ("за сколько можно купить один BTC", {CURRENT}),
+    ("во что сейчас оценивают рипл", {CURRENT}),
+    ("btc price", {CURRENT}),
+    ("how much is cardano", {CURRENT}),
+    ("what's ETH trading at", {CURRENT}),
+    ("динамика биткоина за месяц", {HISTORICAL}),
+    ("история эфира за 90 дней", {HISTORICAL}),
+    ("как менялась солана за последние 2 недели", {HISTORICAL}),
+    ("биткоин за год", {HISTORICAL}),
+    ("насколько упал догикоин за неделю", {HISTORICAL}),
+    ("что было с рипл в последние дни", {HISTORICAL}),
+    ("ethereum chart for the past 3 months", {HISTORICAL}),
+    ("how has bitcoin performed over the last year", {HISTORICAL}),
+    ("курс эфира за год", {CURRENT, HISTORICAL}),
+    ("bitcoin price last 30 days", {CURRENT, HISTORICAL}),
+    ("топ-10 монет", {TOP}),
+    ("рейтинг криптовалют по капитализации", {TOP}),
+    ("крупнейшие криптовалюты", {TOP}),
+    ("кто сейчас лидирует на крипторынке", {TOP}),
+    ("какие монеты в первой пятёрке", {TOP}),
+    ("top 20 cryptocurrencies", {TOP}),
+    ("biggest coins by market cap", {TOP}),
+    ("which coins lead the market", {TOP}),
+]
+
+Predict = Callable[[str], Optional[Sequence[str]]]
+
+
+def _evaluate(name: str, predict: Predict, repeat: int):
+    samples: List[float] = []
+    correct = answered = 0
+    for query, expected in LABELLED:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            predicted = predict(query)
+            samples.append((time.perf_counter() - start) * 1000)
+        if predicted is not None:
+            answered += 1
+            correct += set(predicted) == expected
+    n = len(LABELLED)
+    s = summary(samples)
+    print(f"{name:<22}{correct / n:>10.0%}{answered / n:>10.0%}"
+          f"{correct / max(answered, 1):>12.0%}{s['median']:>12.3f}{s['p95']:>12.3f}")
+
+
+def _classifier() -> Predict:
+    classifier = IntentClassifier()
+
+    def predict(query):
+        intent = classifier.classify(query)
+        # Ниже порога запрос уходит дальше по цепочке — ответа правил нет
+        if intent.confidence < settings.planner_rules_min_confidence:
+            return None
+        return intent.functions
+    return predict
+
+
+def _router() -> Optional[Predict]:
+    router = EmbeddingIntentRouter()
+    if not router._load():
+        return None
+
+    def predict(query):
+        routed = router._classify([query])[0]
+        return None if routed is None else [routed[0]]
+    return predict
+
+
+def _llm(loop: asyncio.AbstractEventLoop) -> Predict:
+    from agent.planner_agent import PlannerAgent
+
+    planner = PlannerAgent()
+    planner.llm.cache_namespace = None
+    classifier = IntentClassifier()
+
+    def predict(query):
+        plan = loop.run_until_complete(planner._plan_structured(query, classifier.classify(query)))
+        return None if plan is None else plan.functions
+    return predict
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--llm-repeat", type=int, default=1)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    print(f"{len(LABELLED)} запросов, порог правил {settings.planner_rules_min_confidence}, "
+          f"порог роутера {settings.intent_router_min_similarity}")
+    print(f"{'путь':<22}{'точность':>10}{'покрытие':>10}{'точн. отв.':>12}"
+          f"{'p50, мс':>12}{'p95, мс':>12}")
+    _evaluate("правила", _classifier(), args.repeat)
+
+    router = _router()
+    if router is None:
+        print(f"{'эмбеддинги':<22}пропущено: sentence-transformers не установлен")
+    else:
+        _evaluate("эмбеддинги", router, args.repeat)
+
+    if not os.getenv("GROQ_API_KEY"):
+        print(f"{'LLM (Groq)':<22}пропущено: нет GROQ_API_KEY")
+        return
+    loop = asyncio.new_event_loop()
+    try:
+        _evaluate("LLM (Groq)", _llm(loop), args.llm_repeat)
+    finally:
+        loop.run_until_complete(EragAPI.aclose())
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Сериализация ответов /market/history, /market/top?limit=100 и /market/prices:
+прежний путь (валидация через response_model + стандартный json) против FastJSONResponse
+(orjson, без повторной валидации модели; ряд PriceSeries вставляется готовым JSON из колонок,
+PriceSeries.to_json, через orjson.Fragment). Для истории отдельно показан промежуточный
+вариант — список dict на точку (to_points) через orjson.
+
+Два замера: только сериализация готового результата сервиса и полный запрос через
+приложение FastAPI (ASGI в памяти) со stub-провайдером вместо апстримов.
+
+    python -m bench.json_responses [--repeat 50]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List
+
+import httpx
+import numpy as np
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+import api.app as app_module
+from agent.contracts import PriceSeries
+from agent.providers.base_provider import ProviderResponse
+from api.models.market import CoinPriceResponse, HistoricalResponse, TopCoinResponse
+from api.responses import ORJSON_AVAILABLE, FastJSONResponse, _plain, orjson
+from bench._common import measure, report
+from cache import freeze
+from settings import settings
+
+HOUR_MS = 3_600_000
+COINS = [f"coin-{i}" for i in range(100)]
+
+
+def _history():
+    rng = np.random.default_rng(0)
+    ts = 1_700_000_000_000 + np.arange(365 * 24, dtype=np.int64) * HOUR_MS
+    series = PriceSeries(ts, 30_000 * np.exp(np.cumsum(rng.normal(0, 0.004, len(ts)))))
+    return {"coin_id": "bitcoin", "period_days": 365, "prices": series,
+            "change_percent": series.change_percent(), "source": "coingecko"}
+
+
+def _top():
+    return [{"rank": i + 1, "coin_id": cid, "symbol": cid[:4], "name": cid.title(),
+             "price_usd": 1000.0 / (i + 1), "market_cap_usd": 1e12 / (i + 1),
+             "change_24h_percent": -1.5 + i / 50, "source": "coingecko"}
+            for i, cid in enumerate(COINS)]
+
+
+def _prices():
+    return {cid: {"coin_id": cid, "price_usd": 1000.0 / (i + 1), "market_cap_usd": 1e12 / (i + 1),
+                  "volume_24h_usd": 1e9 / (i + 1), "change_24h_percent": 0.5, "source": "coingecko"}
+            for i, cid in enumerate(COINS[:20])}
+
+
+ENDPOINTS = {
+    "/market/history/bitcoin?days=365": (HistoricalResponse, _history),
+    "/market/top?limit=100": (List[TopCoinResponse], _top),
+    "/market/prices": (Dict[str, CoinPriceResponse], _prices),
+}
+
+
+def _before(adapter: TypeAdapter, content):
+    # То же, что делает FastAPI для response_model: валидация, сериализация в JSON-типы, json.dumps
+    value = adapter.validate_python(_plain(content))
+    return JSONResponse(adapter.dump_python(value, mode="json")).body
+
+
+class _StubProvider:
+    """Ответы провайдера из памяти: в замер не попадают сеть и кэш."""
+
+    def __init__(self):
+        history = _history()
+        self._data = {
+            "get_historical_prices": history,
+            "get_top_coins": freeze(_top()),
+            "get_current_prices": freeze({cid: {k: v for k, v in d.items() if k != "coin_id"}
+                                          for cid, d in _prices().items()}),
+        }
+
+    async def adispatch(self, method_name, strategy, preferred_provider=None, **kwargs):
+        return ProviderResponse(True, "stub", self._data[method_name], cached=True)
+
+
+def _serialization(repeat: int):
+    for path, (model, build) in ENDPOINTS.items():
+        adapter, content = TypeAdapter(model), build()
+        rows = {"до: response_model + json": measure(lambda: _before(adapter, content), repeat)}
+        if ORJSON_AVAILABLE and isinstance(content, dict) and "prices" in content:
+            rows["dict на точку + orjson"] = measure(
+                lambda: orjson.dumps({**content, "prices": content["prices"].to_points()}), repeat)
+        rows["после: FastJSONResponse"] = measure(lambda: FastJSONResponse(content).body, repeat)
+        report(f"сериализация {path}", rows)
+
+
+async def _requests(repeat: int):
+    app_module.provider = _StubProvider()
+    transport = httpx.ASGITransport(app=app_module.create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ENDPOINTS:
+            rows = {}
+            for fast in (False, True):
+                settings.fast_json_responses = fast
+                samples = []
+                for i in range(repeat + 3):
+                    start = time.perf_counter()
+                    resp = await client.get(path)
+                    resp.raise_for_status()
+                    if i >= 3:
+                        samples.append((time.perf_counter() - start) * 1000)
+                rows["после: fast_json_responses" if fast else "до: response_model"] = samples
+            report(f"запрос {path} ({len(resp.content) // 1024} КБ)", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    print(f"orjson: {'да' if ORJSON_AVAILABLE else 'нет (запасной путь через json)'}")
+    fast = settings.fast_json_responses
+    try:
+        _serialization(args.repeat)
+        asyncio.run(_requests(args.repeat))
+    finally:
+        settings.fast_json_responses = fast
+
+
+if __name__ == "__main__":
+    main()
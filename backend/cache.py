@@ -0,0 +1,215 @@
+"""
+Общий кэш с TTL по пространствам имён и LRU-вытеснением.
+
+- Пустые результаты ({} или []) — полноценные записи: отсутствие записи отличается
+  от закэшированного пустого ответа через сентинел MISS
+- Бюджет задаётся числом записей и приблизительным объёмом в байтах
+- Для пространства имён можно задать окно stale-while-revalidate: после TTL запись
+  ещё grace секунд отдаётся через lookup() с пометкой stale, потом истекает окончательно
+- Все операции короткие и не содержат await, поэтому общий threading.RLock
+  безопасен и для потоков, и для корутин
+- С freeze=True значение при записи превращается в неизменяемый снимок (FrozenDict, tuple):
+  все читатели получают один и тот же объект без копирования, и никто не может
+  случайно испортить закэшированные данные для остальных
+"""
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from settings import settings
+
+MISS = object()
+
+
+class FrozenDict(dict):
+    """dict только для чтения: сериализуется как обычный dict, изменение — TypeError."""
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Закэшированные данные неизменяемы, сделайте копию: dict(value)")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(obj):
+    """Глубокий неизменяемый снимок: dict → FrozenDict, list/tuple → tuple, set → frozenset."""
+    if isinstance(obj, FrozenDict):
+        return obj
+    if isinstance(obj, dict):
+        return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    if isinstance(obj, set):
+        return frozenset(freeze(v) for v in obj)
+    return obj
+
+_PURGE_INTERVAL = 60.0
+
+
+def _sizeof(obj) -> int:
+    if hasattr(obj, "nbytes"):
+        # Массивы NumPy: getsizeof не учитывает буфер у представлений
+        return sys.getsizeof(obj) + (0 if obj.base is None else obj.nbytes)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(i) for i in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(_sizeof(getattr(obj, a, None)) for a in obj.__slots__)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "stale_at", "expires_at", "size")
+
+    def __init__(self, value, stale_at, expires_at, size):
+        self.value = value
+        self.stale_at = stale_at
+        self.expires_at = expires_at
+        self.size = size
+
+
+class TTLCache:
+    def __init__(self, ttls: Dict[str, float], max_entries: int,
+                 max_bytes: Optional[int] = None, default_ttl: float = 60.0,
+                 grace: Optional[Dict[str, float]] = None, freeze: bool = False):
+        self.ttls = dict(ttls)
+        self.freeze = freeze
+        self.grace = dict(grace or {})
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._next_purge = time.time() + _PURGE_INTERVAL
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _counter(self, namespace):
+        c = self._stats.get(namespace)
+        if c is None:
+            c = self._stats[namespace] = {"hits": 0, "stale_hits": 0, "misses": 0,
+                                          "evictions": 0, "expired": 0}
+        return c
+
+    def get(self, namespace: str, key: Hashable, default: Any = MISS) -> Any:
+        value, _ = self.lookup(namespace, key, allow_stale=False)
+        return default if value is MISS else value
+
+    def lookup(self, namespace: str, key: Hashable, allow_stale: bool = True) -> Tuple[Any, bool]:
+        """Возвращает (значение, устарело ли). Промах — (MISS, False)."""
+        with self._lock:
+            k = (namespace, key)
+            entry = self._data.get(k)
+            c = self._counter(namespace)
+            if entry is None:
+                c["misses"] += 1
+                return MISS, False
+            now = time.time()
+            if entry.expires_at <= now:
+                self._remove(k)
+                c["expired"] += 1
+                c["misses"] += 1
+                return MISS, False
+            stale = entry.stale_at <= now
+            if stale and not allow_stale:
+                c["misses"] += 1
+                return MISS, False
+            self._data.move_to_end(k)
+            c["stale_hits" if stale else "hits"] += 1
+            return entry.value, stale
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None) -> Any:
+        """Возвращает сохранённое значение (при freeze — неизменяемый снимок)."""
+        if self.freeze:
+            value = freeze(value)
+        ttl = ttl if ttl is not None else self.ttls.get(namespace, self.default_ttl)
+        size = _sizeof(value) if self.max_bytes else 0
+        with self._lock:
+            k = (namespace, key)
+            if k in self._data:
+                self._remove(k)
+            if self.max_bytes and size > self.max_bytes:
+                self._counter(namespace)["evictions"] += 1
+                return value
+            stale_at = time.time() + ttl
+            self._data[k] = _Entry(value, stale_at, stale_at + self.grace.get(namespace, 0), size)
+            self._bytes += size
+            self._maybe_purge()
+            self._evict()
+        return value
+
+    def delete(self, namespace: str, key: Hashable):
+        with self._lock:
+            self._remove((namespace, key))
+
+    def clear(self, namespace: Optional[str] = None):
+        with self._lock:
+            for k in [k for k in self._data if namespace is None or k[0] == namespace]:
+                self._remove(k)
+
+    def _remove(self, k):
+        entry = self._data.pop(k, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self):
+        while self._data and (len(self._data) > self.max_entries
+                              or (self.max_bytes and self._bytes > self.max_bytes)):
+            k, entry = self._data.popitem(last=False)
+            self._bytes -= entry.size
+            self._counter(k[0])["evictions"] += 1
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + _PURGE_INTERVAL
+        for k in [k for k, e in self._data.items() if e.expires_at <= now]:
+            self._remove(k)
+            self._counter(k[0])["expired"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {}
+            for ns, c in self._stats.items():
+                hits = c["hits"] + c["stale_hits"]
+                lookups = hits + c["misses"]
+                namespaces[ns] = {**c, "hit_rate": round(hits / lookups, 3) if lookups else 0.0}
+            return {"entries": len(self._data), "bytes": self._bytes,
+                    "max_entries": self.max_entries, "max_bytes": self.max_bytes,
+                    "namespaces": namespaces}
+
+
+market_cache = TTLCache(
+    ttls={
+        "prices": settings.cache_ttl_prices,
+        "series": settings.cache_ttl_series,
+        "top": settings.cache_ttl_top,
+        "analytics": settings.cache_ttl_series,
+    },
+    max_entries=settings.cache_max_entries,
+    max_bytes=settings.cache_max_bytes,
+    grace=settings.cache_stale_grace,
+    freeze=True,
+)
+
+llm_cache = TTLCache(
+    ttls={},
+    max_entries=settings.llm_cache_max_entries,
+    max_bytes=settings.llm_cache_max_bytes,
+    default_ttl=settings.llm_cache_ttl,
+)
+
+# Готовые планы по нормализованному тексту запроса; записи мелкие, хватает лимита по числу
+plan_cache = TTLCache(
+    ttls={"plans": settings.plan_cache_ttl},
+    max_entries=settings.plan_cache_max_entries,
+)
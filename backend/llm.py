@@ -1,11 +1,16 @@
 import os
+import json
+import hashlib
 import logging
-from typing import List, Dict, Generator
+from typing import List, Dict, Generator, AsyncGenerator, Optional, Tuple
 
+import httpx
 from dotenv import load_dotenv
 import google.generativeai as genai
-from groq import Groq
+from groq import Groq, AsyncGroq
 
+from agent.providers.http_client import create_http_client, create_async_http_client
+from cache import llm_cache, MISS
 from settings import settings
 
 load_dotenv()
@@ -15,9 +20,11 @@ logger = logging.getLogger(__name__)
 class EragAPI:
     _clients: Dict[str, object] = {}
 
-    def __init__(self, api_type: str, model: str = None):
+    def __init__(self, api_type: str, model: str = None, cache_namespace: str = None):
         self.api_type = api_type
         self.model = model or settings.get_default_model(api_type)
+        # Пространство имён в llm_cache (обычно имя агента); None — без кэша
+        self.cache_namespace = cache_namespace
         cache_key = f"{api_type}:{self.model}"
 
         if cache_key not in EragAPI._clients:
@@ -31,28 +38,90 @@ class EragAPI:
 
         self.client = EragAPI._clients[cache_key]
 
-    def chat(self, messages, temperature=0.7, max_tokens=None, stream=False):
-        return self.client.chat(messages, temperature, max_tokens, stream)
+    def _cache_key(self, messages, temperature, max_tokens, json_mode=False):
+        digest = hashlib.sha256(
+            json.dumps(messages, ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+        return (self.api_type, self.model, digest, temperature, max_tokens, json_mode)
+
+    def _cache_get(self, key):
+        if self.cache_namespace is None:
+            return MISS
+        return llm_cache.get(self.cache_namespace, key)
+
+    def _cache_set(self, key, response):
+        if self.cache_namespace is not None and isinstance(response, str) and response:
+            llm_cache.set(self.cache_namespace, key, response)
+
+    def chat(self, messages, temperature=0.7, max_tokens=None, stream=False, json_mode=False):
+        """json_mode=True — ответ строго JSON-объектом (структурированный вывод провайдера)."""
+        if stream:
+            return self.client.chat(messages, temperature, max_tokens, stream)
+        key = self._cache_key(messages, temperature, max_tokens, json_mode)
+        cached = self._cache_get(key)
+        if cached is not MISS:
+            return cached
+        response = self.client.chat(messages, temperature, max_tokens, False, json_mode)
+        self._cache_set(key, response)
+        return response
+
+    async def achat(self, messages, temperature=0.7, max_tokens=None, json_mode=False):
+        key = self._cache_key(messages, temperature, max_tokens, json_mode)
+        cached = self._cache_get(key)
+        if cached is not MISS:
+            return cached
+        response = await self.client.achat(messages, temperature, max_tokens, json_mode)
+        self._cache_set(key, response)
+        return response
+
+    async def astream(self, messages, temperature=0.7, max_tokens=None) -> AsyncGenerator[str, None]:
+        key = self._cache_key(messages, temperature, max_tokens)
+        cached = self._cache_get(key)
+        if cached is not MISS:
+            yield cached
+            return
+        parts = []
+        async for chunk in self.client.astream(messages, temperature, max_tokens):
+            parts.append(chunk)
+            yield chunk
+        self._cache_set(key, "".join(parts))
+
+    @classmethod
+    async def aclose(cls):
+        """
+        Закрывает общие HTTP-пулы LLM-клиентов (вызывается при остановке приложения).
+        Клиенты тоже забываются: следующий EragAPI создаст новые со свежими пулами.
+        """
+        await GroqClient.close_pools()
+        GeminiClient.reset()
+        cls._clients.clear()
 
 
 class GroqClient:
+    # Все клиенты Groq ходят на один хост — пулы соединений общие для всех моделей
+    _http: Optional[httpx.Client] = None
+    _ahttp: Optional[httpx.AsyncClient] = None
+
     def __init__(self, model: str):
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise EnvironmentError("GROQ_API_KEY отсутствует в .env")
-        self.client = Groq(api_key=api_key)
+        if GroqClient._http is None:
+            GroqClient._http = create_http_client(timeout=settings.llm_request_timeout)
+            GroqClient._ahttp = create_async_http_client(timeout=settings.llm_request_timeout)
+        self.client = Groq(api_key=api_key, http_client=GroqClient._http)
+        self.aclient = AsyncGroq(api_key=api_key, http_client=GroqClient._ahttp)
         self.model = model
         logger.info(f"GroqClient: {model}")
 
-    def chat(self, messages, temperature=0.7, max_tokens=None, stream=False):
+    def _request(self, messages, temperature, max_tokens, stream, json_mode=False):
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+        return dict(model=self.model, messages=messages, temperature=temperature,
+                    max_tokens=max_tokens, stream=stream, **extra)
+
+    def chat(self, messages, temperature=0.7, max_tokens=None, stream=False, json_mode=False):
         try:
             completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=stream,
-            )
+                **self._request(messages, temperature, max_tokens, stream, json_mode))
             if stream:
                 return self._stream(completion)
             return completion.choices[0].message.content
@@ -60,6 +129,36 @@ class GroqClient:
             logger.error(f"Groq ошибка: {e}")
             raise
 
+    async def achat(self, messages, temperature=0.7, max_tokens=None, json_mode=False):
+        try:
+            completion = await self.aclient.chat.completions.create(
+                **self._request(messages, temperature, max_tokens, False, json_mode))
+            return completion.choices[0].message.content
+        except Exception as e:
+            logger.error(f"Groq ошибка: {e}")
+            raise
+
+    async def astream(self, messages, temperature=0.7, max_tokens=None) -> AsyncGenerator[str, None]:
+        try:
+            completion = await self.aclient.chat.completions.create(
+                **self._request(messages, temperature, max_tokens, True))
+            async for chunk in completion:
+                delta = chunk.choices[0].delta
+                if delta and delta.content:
+                    yield delta.content
+        except Exception as e:
+            logger.error(f"Groq ошибка: {e}")
+            raise
+
+    @classmethod
+    async def close_pools(cls):
+        # Асинхронный пул привязан к event loop приложения — закрывается в нём же
+        if cls._ahttp is not None:
+            await cls._ahttp.aclose()
+        if cls._http is not None:
+            cls._http.close()
+        cls._http = cls._ahttp = None
+
     @staticmethod
     def _stream(completion) -> Generator[str, None, None]:
         for chunk in completion:
@@ -69,34 +168,55 @@ class GroqClient:
 
 
 class GeminiClient:
+    """
+    Gemini ходит через gRPC: канал (sync и asyncio) создаётся SDK один раз на процесс
+    после genai.configure, поэтому соединения переиспользуются между вызовами.
+    GenerativeModel кэшируется по (модель, системная инструкция).
+    """
+    _configured = False
+    _max_models = 32
+    _models: Dict[Tuple[str, Optional[str]], "genai.GenerativeModel"] = {}
+
     def __init__(self, model: str):
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise EnvironmentError("GEMINI_API_KEY отсутствует в .env")
-        genai.configure(api_key=api_key)
+        if not GeminiClient._configured:
+            genai.configure(api_key=api_key)
+            GeminiClient._configured = True
         self.model = model
         logger.info(f"GeminiClient: {model}")
 
-    def chat(self, messages, temperature=0.7, max_tokens=None, stream=False):
+    @classmethod
+    def reset(cls):
+        cls._models.clear()
+
+    def _prepare(self, messages: List[Dict], temperature, max_tokens, json_mode=False):
+        """Системные сообщения → system_instruction, остальные → contents."""
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system") or None
+        contents = [{"role": "user" if m["role"] == "user" else "model", "parts": [m["content"]]}
+                    for m in messages if m["role"] != "system"]
+        if not contents:
+            contents, system = [{"role": "user", "parts": [system or ""]}], None
+
+        key = (self.model, system)
+        model = GeminiClient._models.get(key)
+        if model is None:
+            if len(GeminiClient._models) >= GeminiClient._max_models:
+                GeminiClient._models.clear()
+            model = genai.GenerativeModel(self.model, system_instruction=system)
+            GeminiClient._models[key] = model
+        config = genai.types.GenerationConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+            response_mime_type="application/json" if json_mode else None,
+        )
+        return model, contents, config
+
+    def chat(self, messages, temperature=0.7, max_tokens=None, stream=False, json_mode=False):
         try:
-            model = genai.GenerativeModel(self.model)
-            config = genai.types.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=max_tokens,
-            )
-
-            history = []
-            for msg in messages[:-1]:
-                role = "user" if msg["role"] in ("user", "system") else "model"
-                content = msg["content"]
-                if msg["role"] == "system":
-                    content = f"[Системная инструкция: {content}]"
-                history.append({"role": role, "parts": [content]})
-
-            chat = model.start_chat(history=history)
-            last_message = messages[-1]["content"]
-            response = chat.send_message(last_message, generation_config=config, stream=stream)
-
+            model, contents, config = self._prepare(messages, temperature, max_tokens, json_mode)
+            response = model.generate_content(contents, generation_config=config, stream=stream)
             if stream:
                 return (chunk.text for chunk in response)
             return response.text
@@ -104,6 +224,26 @@ class GeminiClient:
             logger.error(f"Gemini ошибка: {e}")
             raise
 
+    async def achat(self, messages, temperature=0.7, max_tokens=None, json_mode=False):
+        try:
+            model, contents, config = self._prepare(messages, temperature, max_tokens, json_mode)
+            response = await model.generate_content_async(contents, generation_config=config)
+            return response.text
+        except Exception as e:
+            logger.error(f"Gemini ошибка: {e}")
+            raise
+
+    async def astream(self, messages, temperature=0.7, max_tokens=None) -> AsyncGenerator[str, None]:
+        try:
+            model, contents, config = self._prepare(messages, temperature, max_tokens)
+            response = await model.generate_content_async(contents, generation_config=config,
+                                                          stream=True)
+            async for chunk in response:
+                yield chunk.text
+        except Exception as e:
+            logger.error(f"Gemini ошибка: {e}")
+            raise
+
 
-def create_erag_api(api_type: str, model: str = None) -> EragAPI:
-    return EragAPI(api_type, model)
\ No newline at end of file
+def create_erag_api(api_type: str, model: str = None, cache_namespace: str = None) -> EragAPI:
+    return EragAPI(api_type, model, cache_namespace)
\ No newline at end of file
@@ -1,5 +1,5 @@
 import os
-from typing import Optional, Dict
+from typing import Any, Optional, Dict
 
 from dotenv import load_dotenv
 
@@ -18,24 +18,92 @@ class Settings:
     def _initialize(self):
         self.project_root = os.path.dirname(os.path.abspath(__file__))
 
-        self.agent_models: Dict[str, Dict[str, str]] = {
-            "planner":  {"api": "groq", "model": "meta-llama/llama-4-scout-17b-16e-instruct"},
-            "reasoner": {"api": "groq", "model": "meta-llama/llama-4-scout-17b-16e-instruct"},
-            "fetcher":  {"api": "groq", "model": "meta-llama/llama-4-scout-17b-16e-instruct"},
+        # cache — кэшировать ли ответы LLM этого агента (llm_cache)
+        self.agent_models: Dict[str, Dict[str, Any]] = {
+            "planner":  {"api": "groq", "model": "meta-llama/llama-4-scout-17b-16e-instruct", "cache": True},
+            "reasoner": {"api": "groq", "model": "meta-llama/llama-4-scout-17b-16e-instruct", "cache": True},
+            "fetcher":  {"api": "groq", "model": "meta-llama/llama-4-scout-17b-16e-instruct", "cache": False},
         }
 
         self.temperature: float = 0.1
         self.max_tokens: Optional[int] = None
 
         self.api_request_timeout: int = 15
+        # Таймаут запроса к LLM: генерация длиннее обычных запросов к API данных
+        self.llm_request_timeout: float = 60.0
         self.api_max_retries: int = 3
         self.api_backoff_base: float = 1.0
+        self.provider_max_concurrency: int = 4
+
+        self.http_max_connections: int = 20
+        self.http_max_keepalive: int = 10
+        self.http_keepalive_expiry: float = 60.0
+
+        self.breaker_failure_threshold: int = 3
+        self.breaker_cooldown: float = 30.0
+        self.breaker_rate_limit_cooldown: float = 60.0
+        self.health_probe_interval: float = 10.0
+        self.health_idle_probe_interval: float = 300.0
 
         self.cache_ttl_prices: int = 120
         self.cache_ttl_historical: int = 300
         self.cache_ttl_top: int = 180
+        self.cache_ttl_series: int = 86400
+        # Окно stale-while-revalidate после TTL, секунды; 0 — выключено
+        self.cache_stale_grace: Dict[str, int] = {"prices": 60, "historical": 300, "top": 180}
+        self.background_refresh_workers: int = 4
+
+        self.prefetch_interval: float = 5.0
+        self.prefetch_top_k: int = 20
+        self.prefetch_min_score: float = 3.0
+        self.prefetch_half_life: float = 600.0
+        self.prefetch_lead: float = 15.0
+        self.prefetch_budget_per_minute: int = 10
+        self.prefetch_max_tracked: int = 1000
+        self.top_coins_superset: int = 250
+        self.cache_max_entries: int = 2048
+        self.cache_max_bytes: int = 64 * 1024 * 1024
+
+        self.llm_cache_ttl: int = 600
+        self.llm_cache_max_entries: int = 1024
+        self.llm_cache_max_bytes: int = 16 * 1024 * 1024
+
+        self.plan_cache_ttl: int = 3600
+        self.plan_cache_max_entries: int = 4096
+
+        # Реестр монет: снимок на диске, период обновления из апстрима и сколько
+        # крупнейших монет (по рангу CMC) ищется в тексте запроса по названию и тикеру
+        self.coin_registry_path: str = os.path.join(os.path.dirname(__file__), "data",
+                                                    "coin_registry.json.gz")
+        self.coin_registry_refresh_interval: int = 86400
+        self.coin_registry_check_interval: float = 3600.0
+        self.coin_matcher_max_rank: int = 250
+
+        # Локальный роутер функций по эмбеддингам (sentence-transformers на CPU)
+        self.intent_router_enabled: bool = False
+        self.intent_router_model: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+        self.intent_router_min_similarity: float = 0.6
+        self.intent_router_k: int = 3
+        self.intent_router_batch_size: int = 32
+        self.intent_router_batch_window: float = 0.005
+
+        # Планировщик: порог уверенности локального разбора, ниже которого вызывается LLM
+        self.planner_rules_min_confidence: float = 0.85
+        # Один запрос к LLM за весь план в JSON-режиме; False — прежние два запроса
+        self.planner_structured: bool = True
+
+        # Сколько точек ряда отправлять reasoner'у, когда для ряда посчитана аналитика
+        self.context_points_with_analytics: int = 24
+
+        # Бюджет контекста reasoner'а в токенах: по модели, иначе max_context_tokens
+        self.max_context_tokens: int = 4000
+        self.context_token_budgets: Dict[str, int] = {
+            "meta-llama/llama-4-scout-17b-16e-instruct": 6000,
+            "gemini-2.0-flash": 12000,
+        }
 
-        self.max_context_length: int = 15000
+        # Ответы /market/* сериализуются orjson без повторной валидации response_model
+        self.fast_json_responses: bool = True
 
         self.cors_origins = [
             "http://localhost:8501",
@@ -53,7 +121,7 @@ class Settings:
             raise ValueError(f"Неизвестный тип API: {api_type}")
         return defaults[api_type]
 
-    def get_agent_config(self, agent_name: str) -> Dict[str, str]:
+    def get_agent_config(self, agent_name: str) -> Dict[str, Any]:
         if agent_name not in self.agent_models:
             raise ValueError(f"Неизвестный агент: '{agent_name}'")
         return self.agent_models[agent_name]
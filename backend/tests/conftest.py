@@ -0,0 +1,33 @@
+import os
+import sys
+
+import httpx
+import pytest
+
+# Тесты импортируют модули backend так же, как main.py: от корня backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def gecko_provider():
+    """
+    Фабрика CoinGeckoProvider, у которого апстрим — httpx.MockTransport с заданным обработчиком.
+    market_cache (вместе с хранилищем рядов) очищается до и после теста.
+    """
+    from agent.providers.coingecko_provider import CoinGeckoProvider
+    from cache import market_cache
+
+    providers = []
+
+    def make(handler) -> CoinGeckoProvider:
+        provider = CoinGeckoProvider()
+        provider._client.close()
+        provider._client = httpx.Client(transport=httpx.MockTransport(handler))
+        providers.append(provider)
+        return provider
+
+    market_cache.clear()
+    yield make
+    for provider in providers:
+        provider.close()
+    market_cache.clear()
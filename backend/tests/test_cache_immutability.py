@@ -0,0 +1,76 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from agent.contracts import DataEntry, FetchedData
+from agent.data_formatter import DataFormatter
+from agent.providers.coingecko_provider import CoinGeckoProvider
+from agent.providers.series_store import DAY_MS, PriceHistory, series_store
+from agent.series_analytics import SeriesAnalyzer
+from cache import market_cache
+
+PRICES_KEY = ("coingecko", "bitcoin,ethereum", "usd")
+TOP_KEY = ("coingecko", 250, "usd")
+SERIES_KEY = ("coingecko", "bitcoin", "usd", "daily")
+
+
+@pytest.fixture
+def cached():
+    market_cache.clear()
+    market_cache.set("prices", PRICES_KEY, {
+        "bitcoin": {"price_usd": 65000.5, "market_cap_usd": 1.28e12, "source": "coingecko"},
+        "ethereum": {"price_usd": 3100.25, "market_cap_usd": 3.7e11, "source": "coingecko"},
+    })
+    market_cache.set("top", TOP_KEY, [
+        {"id": "bitcoin", "symbol": "btc", "current_price": 65000.5, "tags": ["pow"]},
+        {"id": "ethereum", "symbol": "eth", "current_price": 3100.25, "tags": ["pos"]},
+    ])
+    ts = 1_700_000_000_000 + np.arange(400, dtype=np.int64) * DAY_MS
+    prices = 30_000 * np.exp(np.cumsum(np.random.default_rng(7).normal(0, 0.02, len(ts))))
+    series_store.put(SERIES_KEY, PriceHistory.from_raw(np.column_stack((ts, prices)), 365, DAY_MS))
+    yield
+    market_cache.clear()
+
+
+def _snapshot():
+    history = series_store.get(SERIES_KEY)
+    return (pickle.dumps(market_cache.get("prices", PRICES_KEY)),
+            pickle.dumps(market_cache.get("top", TOP_KEY)),
+            history.series.timestamps.tobytes(), history.series.prices.tobytes(),
+            pickle.dumps((history.days, history.step_ms, history.fetched_at)))
+
+
+def test_formatting_leaves_cache_unchanged(cached):
+    before = _snapshot()
+    history = series_store.get(SERIES_KEY)
+    fetched = FetchedData(entries=[
+        DataEntry(function="coingecko_current_price", data=market_cache.get("prices", PRICES_KEY)),
+        DataEntry(function="coingecko_top_coins", data=market_cache.get("top", TOP_KEY)),
+        DataEntry(function="coingecko_historical_prices",
+                  data={"bitcoin": CoinGeckoProvider._history_result("bitcoin", 90, history)}),
+    ])
+    analytics = SeriesAnalyzer().analyze(fetched)
+    context = DataFormatter().format(fetched, "btc", analytics=analytics)
+    assert context.total_tokens > 0 and analytics["series"]
+
+    assert _snapshot() == before
+
+
+def test_cached_values_reject_mutation(cached):
+    prices = market_cache.get("prices", PRICES_KEY)
+    top = market_cache.get("top", TOP_KEY)
+    series = series_store.get(SERIES_KEY).series
+
+    with pytest.raises(TypeError):
+        prices["bitcoin"]["price_usd"] = 0
+    with pytest.raises(TypeError):
+        prices.pop("ethereum")
+    with pytest.raises(TypeError):
+        top[0] = {}
+    with pytest.raises(TypeError):
+        top[0]["current_price"] = 0
+    with pytest.raises(TypeError):
+        top[0]["tags"][0] = "pos"
+    with pytest.raises(ValueError):
+        series.prices[0] = 0.0
@@ -0,0 +1,57 @@
+import asyncio
+
+from agent.contracts import PlanResult
+from agent.controller_agent import ControllerAgent
+
+
+class _Stub:
+    def __init__(self, result=None, error=None):
+        self.result, self.error = result, error
+
+    async def execute(self, *args):
+        if self.error:
+            raise self.error
+        return self.result
+
+    def analyze(self, data):
+        return self.result
+
+    def format(self, *args):
+        return self.result
+
+    async def astream(self, query, context):
+        for chunk in ("Би", "ткоин"):
+            yield chunk
+
+
+def _controller(fetch_error=None):
+    controller = ControllerAgent.__new__(ControllerAgent)
+    controller.planner = _Stub(PlanResult(functions=["coingecko_current_price"], coins=["bitcoin"],
+                                          period_days=7, original_query="q", planner_path="rules",
+                                          confidence=1.0))
+    controller.fetcher = _Stub({"prices": {}}, error=fetch_error)
+    controller.analyzer = _Stub({"series": {}})
+    controller.formatter = controller.reasoner = _Stub("контекст")
+    controller.graph = controller._build_graph(ControllerAgent.STEPS)
+    controller.stream_graph = controller._build_graph(ControllerAgent.STEPS[:-1])
+    return controller
+
+
+async def _events(controller):
+    return [event async for event in controller.astream_trace("цена биткоина")]
+
+
+def test_stream_emits_every_graph_step_then_tokens():
+    events = asyncio.run(_events(_controller()))
+    steps = [data["step"] for event, data in events if event == "step"]
+    assert steps == list(ControllerAgent.STEPS)
+    assert [data["text"] for event, data in events if event == "token"] == ["Би", "ткоин"]
+    assert events[-1][0] == "done" and events[-1][1]["answer"] == "Биткоин"
+
+
+def test_stream_routes_errors_like_the_graph():
+    events = asyncio.run(_events(_controller(fetch_error=RuntimeError("апстрим недоступен"))))
+    assert [data["step"] for event, data in events if event == "step"] == ["planner", "fetcher"]
+    assert not any(event == "token" for event, _ in events)
+    done = events[-1][1]
+    assert done["answer"] == "Ошибка на этапе 'fetcher': fetcher: апстрим недоступен"
@@ -0,0 +1,76 @@
+import re
+
+import numpy as np
+
+from agent.contracts import DataEntry, FetchedData, PriceSeries
+from agent.data_formatter import DataFormatter
+
+HOUR_MS = 3_600_000
+
+
+def _hourly_year(seed=1):
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000_000 + np.arange(365 * 24, dtype=np.int64) * HOUR_MS
+    prices = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.01, len(ts))))
+    return PriceSeries(ts, prices)
+
+
+def _context(series, analytics=None):
+    data = FetchedData(entries=[DataEntry(
+        function="coingecko_historical_prices",
+        data={"bitcoin": {"coin_id": "bitcoin", "period_days": 365, "prices": series}})])
+    return DataFormatter().format(data, analytics=analytics).context_str
+
+
+def _offsets(context):
+    match = re.search(r"^t_h: (.+)$", context, re.MULTILINE)
+    assert match, context
+    return [int(v) for v in match.group(1).split(",")]
+
+
+def test_thinned_series_keeps_real_timestamps():
+    series = _hourly_year()
+    context = _context(series)
+    assert "step=" not in context
+    offsets = _offsets(context)
+    prices = re.search(r"^prices: (.+)$", context, re.MULTILINE).group(1).split(",")
+    assert len(offsets) == len(prices) < len(series)
+
+    # Каждое смещение указывает на реальный отсчёт исходного ряда, а не на точку равномерной сетки
+    stamps = series.timestamps[0] + np.array(offsets) * HOUR_MS
+    assert np.isin(stamps, series.timestamps).all()
+    assert len(set(np.diff(offsets).tolist())) > 1
+
+
+def test_series_with_analytics_also_gets_offsets():
+    series = _hourly_year()
+    analytics = {"series": {"bitcoin": {"points": len(series)}}, "correlation": {}}
+    assert len(_offsets(_context(series, analytics))) <= 24
+
+
+def test_short_series_keeps_uniform_step():
+    series = _hourly_year()[:48]
+    context = _context(series)
+    assert "step=1h" in context and "t_h:" not in context
+
+
+def test_budget_is_a_hard_cap(monkeypatch):
+    monkeypatch.setattr(DataFormatter, "_budget", staticmethod(lambda: 6000))
+    top = [{"rank": i + 1, "coin_id": f"coin-{i}", "symbol": f"C{i}", "name": f"Coin {i}",
+            "price_usd": 1000.0 / (i + 1), "market_cap_usd": 1e12 / (i + 1),
+            "change_24h_percent": -1.5 + i / 50} for i in range(250)]
+    prices = {f"coin-{i}": {"price_usd": 1000.0 / (i + 1), "market_cap_usd": 1e12 / (i + 1),
+                            "volume_24h_usd": 1e9 / (i + 1), "change_24h_percent": 0.5}
+              for i in range(30)}
+    history = {f"coin-{i}": {"coin_id": f"coin-{i}", "period_days": 365,
+                             "prices": _hourly_year(seed=i)} for i in range(5)}
+    data = FetchedData(entries=[
+        DataEntry(function="coingecko_top_coins", data=top),
+        DataEntry(function="coingecko_current_price", data=prices),
+        DataEntry(function="coingecko_historical_prices", data=history),
+    ])
+    ctx = DataFormatter().format(data)
+    assert ctx.total_tokens <= 6000 and ctx.was_truncated
+    # Каждый ряд остаётся в контексте со своим описанием
+    assert all(f"coin-{i}: period_days=365" in ctx.context_str for i in range(5))
+    assert ctx.context_str.count("prices: ") == 5
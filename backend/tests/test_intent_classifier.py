@@ -0,0 +1,62 @@
+import pytest
+
+from agent.intent_classifier import IntentClassifier
+from settings import settings
+
+CURRENT = "coingecko_current_price"
+HISTORICAL = "coingecko_historical_prices"
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier()
+
+
+@pytest.mark.parametrize("query", [
+    "почему упал биткоин?",
+    "центральный банк и биткоин",
+    "центр притяжения для эфира",
+])
+def test_stems_do_not_match_inside_other_words(classifier, query):
+    result = classifier.classify(query)
+    assert CURRENT not in result.functions
+    assert result.confidence < settings.planner_rules_min_confidence
+
+
+@pytest.mark.parametrize("query", ["цена биткоина", "сколько стоит эфир", "почём солана",
+                                   "how much is btc"])
+def test_current_price(classifier, query):
+    result = classifier.classify(query)
+    assert result.functions == [CURRENT]
+    assert result.confidence >= settings.planner_rules_min_confidence
+
+
+@pytest.mark.parametrize("query, days", [
+    ("bitcoin history over the last month", 30),
+    ("price trend of ethereum in the past year", 365),
+    ("btc over the past 3 months", 90),
+    ("динамика биткоина за 2 недели", 14),
+    ("история эфира за 30 дней", 30),
+])
+def test_historical_period(classifier, query, days):
+    result = classifier.classify(query)
+    assert HISTORICAL in result.functions
+    assert result.period_days == days and result.period_explicit
+
+
+def test_historical_without_period_goes_past_rules(classifier):
+    result = classifier.classify("история биткоина")
+    assert result.functions == [HISTORICAL]
+    assert result.confidence < settings.planner_rules_min_confidence
+
+
+@pytest.mark.parametrize("query, days", [
+    ("курс эфира за год", 365),
+    ("цена солана за 3 месяца", 90),
+    ("bitcoin price last 30 days", 30),
+    ("btc price 2 weeks", 14),
+])
+def test_price_with_period_fetches_history(classifier, query, days):
+    result = classifier.classify(query)
+    assert HISTORICAL in result.functions
+    assert result.period_days == days and result.period_explicit
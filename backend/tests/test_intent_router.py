@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from agent.intent_router import EmbeddingIntentRouter
+from settings import settings
+
+# Единичные векторы на плоскости: косинус с запросом "q" задан явно
+VECTORS = {
+    "a1": [0.9, 0.436], "a2": [0.9, -0.436],
+    "b1": [0.95, 0.312], "b2": [0.0, 1.0],
+    "q": [1.0, 0.0], "far": [0.0, -1.0],
+}
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(settings, "intent_router_k", 3)
+    monkeypatch.setattr(settings, "intent_router_min_similarity", 0.6)
+    router = EmbeddingIntentRouter()
+    router._encode = lambda texts: np.array([VECTORS[t] for t in texts])
+    router._labels = ["A", "A", "B", "B"]
+    router._bank = router._encode(["a1", "a2", "b1", "b2"])
+    return router
+
+
+def test_neighbours_vote_by_summed_similarity(router):
+    # Ближайший пример — "B" (0.95), но два "A" по 0.9 перевешивают
+    assert router._classify(["q"]) == [("A", 0.9)]
+
+
+def test_below_min_similarity_is_not_routed(router):
+    assert router._classify(["far"]) == [None]
+
+
+def test_batch_keeps_query_order(router):
+    assert router._classify(["far", "q"]) == [None, ("A", 0.9)]
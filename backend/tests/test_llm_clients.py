@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from llm import EragAPI, GroqClient
+
+
+@pytest.fixture(autouse=True)
+def groq_key(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    yield
+    asyncio.run(EragAPI.aclose())
+
+
+def test_clients_recreated_after_close():
+    async def lifespan():
+        api = EragAPI("groq", "test-model")
+        client = api.client
+        assert not GroqClient._ahttp.is_closed
+        await EragAPI.aclose()
+        return client
+
+    first = asyncio.run(lifespan())
+    # Следующий lifespan в том же процессе (новый event loop) получает новые клиенты и пулы
+    second = asyncio.run(lifespan())
+    assert second is not first
+    assert EragAPI._clients == {}
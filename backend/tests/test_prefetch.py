@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from agent.providers.base_provider import FetchStrategy, ProviderResponse
+from agent.providers.prefetch import PrefetchScheduler
+from settings import settings
+
+
+class _Manager:
+    def __init__(self):
+        self.calls = []
+
+    def add_listener(self, listener):
+        pass
+
+    def dispatch(self, method_name, strategy, preferred_provider=None, **kwargs):
+        self.calls.append((method_name, kwargs))
+        return ProviderResponse(True, "stub", {})
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "prefetch_min_score", 0.5)
+    return PrefetchScheduler(_Manager())
+
+
+def _hit(scheduler, method_name, cached=True, **kwargs):
+    scheduler.record(method_name, FetchStrategy.BEST_FOR, None, kwargs,
+                     ProviderResponse(True, "stub", {}, cached=cached))
+
+
+def test_keys_sharing_a_cache_entry_are_refreshed_once(scheduler):
+    for limit in (5, 10, 20):
+        _hit(scheduler, "get_top_coins", limit=limit)
+    for days in (7, 30, 90):
+        _hit(scheduler, "get_historical_prices", coin_id="bitcoin", days=days)
+
+    due = sorted((h.method_name, h.kwargs.get("limit") or h.kwargs.get("days"))
+                 for h in scheduler._due(time.time()))
+    assert due == [("get_historical_prices", 90), ("get_top_coins", 20)]
+    # Популярность по-прежнему считается по каждому ключу отдельно
+    assert scheduler.stats()["tracked"] == 6
+
+
+def test_hourly_window_is_a_separate_series(scheduler):
+    _hit(scheduler, "get_historical_prices", coin_id="bitcoin", days=1)
+    _hit(scheduler, "get_historical_prices", coin_id="bitcoin", days=30)
+    assert len(scheduler._due(time.time())) == 2
+
+
+def test_upstream_fetch_of_any_key_marks_the_entry_fresh(scheduler):
+    _hit(scheduler, "get_historical_prices", coin_id="bitcoin", days=90)
+    _hit(scheduler, "get_historical_prices", coin_id="bitcoin", days=7, cached=False)
+    assert scheduler._due(time.time()) == []
@@ -0,0 +1,29 @@
+import json
+import math
+
+import pytest
+
+import agent.contracts.series as series_module
+from agent.contracts.series import PriceSeries
+
+
+def test_from_pairs_drops_null_prices():
+    series = PriceSeries.from_pairs([[1000, 1.5], [2000, None], [3000, float("nan")], [4000, 2.0]])
+    assert series.timestamps.tolist() == [1000, 4000]
+    assert series.prices.tolist() == [1.5, 2.0]
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_to_json_matches_points(monkeypatch, use_orjson):
+    if use_orjson and not series_module.ORJSON_AVAILABLE:
+        pytest.skip("orjson не установлен")
+    monkeypatch.setattr(series_module, "ORJSON_AVAILABLE", use_orjson)
+    series = PriceSeries([1000, 2000, 3000, 4000], [1.5, math.nan, math.inf, 0.1 + 0.2])
+    assert json.loads(series.to_json()) == [
+        {"timestamp": 1000, "price": 1.5},
+        {"timestamp": 2000, "price": None},
+        {"timestamp": 3000, "price": None},
+        {"timestamp": 4000, "price": 0.1 + 0.2},
+    ]
+    assert series[:0].to_json() == b"[]"
+    assert json.loads(series[:1].to_json()) == [{"timestamp": 1000, "price": 1.5}]
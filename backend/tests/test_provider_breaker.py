@@ -0,0 +1,67 @@
+import time
+
+import httpx
+import pytest
+
+from agent.providers.base_provider import FetchStrategy, ProviderStatus
+from agent.providers.health import BreakerState
+from agent.providers.provider_manager import ProviderManager
+
+
+def _chart(days):
+    now = int(time.time() * 1000)
+    return {"prices": [[now - (days - i) * 86_400_000, 100.0 + i] for i in range(days + 1)]}
+
+
+@pytest.fixture
+def gecko(gecko_provider):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if "market_chart" in request.url.path:
+            return httpx.Response(200, json=_chart(int(request.url.params["days"])))
+        return httpx.Response(200, json={"bitcoin": {"usd": 1.0}})
+
+    return gecko_provider(handler), calls
+
+
+def _open(provider):
+    for _ in range(3):
+        provider.health.record_failure(ProviderStatus.RATE_LIMITED, "HTTP 429")
+    assert provider.health.state == BreakerState.OPEN
+
+
+def test_open_breaker_still_serves_cached_series(gecko):
+    provider, calls = gecko
+    manager = ProviderManager([provider])
+    assert manager.dispatch("get_historical_prices", FetchStrategy.BEST_FOR,
+                            coin_id="bitcoin", days=7).success
+    _open(provider)
+    sent = len(calls)
+
+    resp = manager.dispatch("get_historical_prices", FetchStrategy.BEST_FOR,
+                            coin_id="bitcoin", days=7)
+    assert resp.success and resp.cached
+    assert len(calls) == sent
+
+
+def test_open_breaker_skips_upstream_on_miss(gecko):
+    provider, calls = gecko
+    _open(provider)
+    resp = ProviderManager([provider]).dispatch(
+        "get_current_prices", FetchStrategy.BEST_FOR, coin_ids=["bitcoin"])
+    assert not resp.success
+    assert calls == []
+
+
+def test_cached_answer_does_not_hold_half_open_trial(gecko, monkeypatch):
+    provider, calls = gecko
+    assert provider.get_current_prices(["bitcoin"]).success
+    _open(provider)
+    monkeypatch.setattr(provider.health, "_open_for", 0.0)
+
+    assert provider.get_current_prices(["bitcoin"]).cached
+    # Проба достаётся первому запросу, который действительно идёт в апстрим
+    assert provider.get_current_prices(["ethereum"]).success
+    assert provider.health.state == BreakerState.CLOSED
@@ -0,0 +1,43 @@
+import pytest
+
+from agent.coin_registry import CoinRegistry
+from agent.query_matcher import build_matcher
+
+CG = [
+    {"id": "flow", "symbol": "flow", "name": "Flow"},
+    {"id": "coredaoorg", "symbol": "core", "name": "Core"},
+    {"id": "safe", "symbol": "safe", "name": "Safe"},
+    {"id": "movement", "symbol": "move", "name": "Movement"},
+    {"id": "notcoin", "symbol": "not", "name": "Notcoin"},
+    {"id": "floki", "symbol": "floki", "name": "FLOKI"},
+    {"id": "render-token", "symbol": "render", "name": "Render"},
+]
+CMC = [{"slug": c["id"], "symbol": c["symbol"].upper(), "name": c["name"], "rank": 100 + i}
+       for i, c in enumerate(CG)]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    registry = CoinRegistry()
+    registry.refresh(CG, CMC)
+    return build_matcher(registry.aliases(250), registry.tickers(250))
+
+
+@pytest.mark.parametrize("query", [
+    "show the flow of money into core assets",
+    "is it safe to move funds now",
+    "why not render a chart",
+    "what is the price",
+])
+def test_ordinary_words_are_not_coins(matcher, query):
+    assert matcher.match(query).coins == []
+
+
+@pytest.mark.parametrize("query, coins", [
+    ("цена $FLOW и $not", ["flow", "notcoin"]),
+    ("FLOKI price vs notcoin", ["floki", "notcoin"]),
+    ("floki price", ["floki"]),
+    ("movement and btc", ["movement", "bitcoin"]),
+])
+def test_names_tickers_and_dollar_prefix(matcher, query, coins):
+    assert matcher.match(query).coins == coins
@@ -0,0 +1,19 @@
+import json
+
+import pytest
+
+import api.responses as responses
+from agent.contracts import PriceSeries
+from cache import freeze
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_price_series_body_matches_points(monkeypatch, use_orjson):
+    if use_orjson and not responses.ORJSON_AVAILABLE:
+        pytest.skip("orjson не установлен")
+    monkeypatch.setattr(responses, "ORJSON_AVAILABLE", use_orjson)
+    series = PriceSeries([1000, 2000], [1.5, 2.25])
+    content = freeze({"coin_id": "bitcoin", "prices": series, "tags": ("a",)})
+    assert json.loads(responses.FastJSONResponse(content).body) == {
+        "coin_id": "bitcoin", "prices": series.to_points(), "tags": ["a"],
+    }
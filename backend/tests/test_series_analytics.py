@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from agent.contracts import PriceSeries
+from agent.providers.series_store import DAY_MS
+from agent.series_analytics import series_stats
+
+HOUR_MS = 3_600_000
+
+
+@pytest.mark.parametrize("step_ms", [HOUR_MS, DAY_MS])
+def test_moving_average_windows_are_in_days(step_ms):
+    n = round(90 * DAY_MS / step_ms)
+    prices = np.linspace(100.0, 200.0, n)
+    stats = series_stats(PriceSeries(np.arange(n, dtype=np.int64) * step_ms, prices))
+    week = round(7 * DAY_MS / step_ms)
+    assert stats["sma_7d"] == pytest.approx(prices[-week:].mean())
+    assert stats["sma_30d"] == pytest.approx(prices[-30 * week // 7:].mean())
+    assert "sma_7" not in stats
+
+
+def test_window_longer_than_series_is_omitted():
+    n = 10 * 24
+    stats = series_stats(PriceSeries(np.arange(n, dtype=np.int64) * HOUR_MS, np.full(n, 5.0)))
+    assert "sma_7d" in stats and "sma_30d" not in stats and "ema_30d" not in stats
@@ -0,0 +1,37 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from agent.providers.series_store import series_store
+
+
+def test_concurrent_windows_share_one_series(gecko_provider):
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def handler(request):
+        days = int(request.url.params["days"])
+        calls.append(days)
+        if days == 7:
+            # Короткое окно отвечает последним — раньше оно затирало длинное
+            started.set()
+            release.wait(5)
+        now = int(time.time() * 1000)
+        return httpx.Response(200, json={
+            "prices": [[now - (days - i) * 86_400_000, 1.0 + i] for i in range(days + 1)]})
+
+    provider = gecko_provider(handler)
+    with ThreadPoolExecutor(2) as pool:
+        short = pool.submit(provider.get_historical_prices, "bitcoin", days=7)
+        started.wait(5)
+        long = pool.submit(provider.get_historical_prices, "bitcoin", days=365)
+        time.sleep(0.2)
+        release.set()
+        short, long = short.result(), long.result()
+
+    assert short.success and long.success
+    assert len(long.data["prices"]) == 366
+    # Длинное окно не потеряно: в хранилище остался ряд на 365 дней
+    assert series_store.get(("coingecko", "bitcoin", "usd", "daily")).covers(365)
+    assert calls == [7, 365]